@@ -3,7 +3,7 @@ import os
 import logging
 import importlib
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from modules.static_files import PrecompressedStaticFiles
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("app_entry")
@@ -74,9 +74,10 @@ else:
     app.mount("/api", api)
 
 # 3) Serve built frontend (Vite) from / (SPA fallback)
+#    precompressed .br/.gz variants, immutable hashed assets, revalidated index.html
 STATIC_DIR = os.path.abspath(os.getenv("STATIC_DIR", "static"))
 if os.path.isdir(STATIC_DIR):
     logger.info(f"Serving static from {STATIC_DIR}")
-    app.mount("/", StaticFiles(directory=STATIC_DIR, html=True), name="static")
+    app.mount("/", PrecompressedStaticFiles(directory=STATIC_DIR, html=True), name="static")
 else:
     logger.warning(f"STATIC_DIR not found: {STATIC_DIR} (frontend not mounted)")
\ No newline at end of file
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Load test for /api/chat: many simulated multi-turn conversations at a given arrival rate.
+
+Modes:
+  inproc  call the FastAPI handlers directly on a thread pool (no sockets)
+  serve   start uvicorn on localhost in this process, then drive it over HTTP
+  http    drive an already running server (--url); stand-ins are not applied
+
+In inproc/serve mode PakRailScraper and the LLM are replaced by stand-ins with
+configurable latency, so results measure our own overhead + queueing.
+
+Example:
+  python benchmarks/load_test.py --mode inproc --rate 50 --conversations 2000 \\
+      --scrape-latency-ms 800 --llm-latency-ms 400
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CITIES = ["Karachi", "Lahore", "Islamabad", "Rawalpindi", "Multan", "Peshawar", "Quetta", "Faisalabad"]
+ERROR_MARKERS = ["Kuch masla aa gaya", "technical masla"]
+NO_RESULTS_MARKER = "koi trains maujood nahi"  # a confirm that found nothing means the scrape failed here
+
+
+# ---------------- Stand-ins ----------------
+def _sleep_ms(mean_ms: float):
+    if mean_ms > 0:
+        # lognormal jitter around the mean gives a realistic tail
+        time.sleep(random.lognormvariate(0, 0.5) * mean_ms / 1000.0 / 1.133)
+
+
+class FakeScraper:
+    """Drop-in for PakRailScraper: no browser, fixed latency, sample data."""
+
+    latency_ms = 0.0
+
+    def __init__(self):
+        from modules.scraper import PakRailScraper
+        self._real = PakRailScraper.__new__(PakRailScraper)  # skip driver setup
+        from config.settings import Config
+        from modules.utils import Logger
+        self._real.logger = Logger("FakeScraper")
+        self._real.config = Config()
+        self._real.fetch_mode = "live"
+        self._real.archive = None
+
+    def scrape_train_info(self, from_station, to_station, travel_date, time_preference=None):
+        _sleep_ms(self.latency_ms)
+        return self._real.generate_sample_data(from_station, to_station, travel_date, time_preference)
+
+
+class FakeLLM:
+    """Drop-in for the ChatOpenAI client used by _llm_extract."""
+
+    class _Msg:
+        content = json.dumps({"from_station": None, "to_station": None, "travel_date": None,
+                              "budget": None, "preferred_time": None, "format_pref": None})
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def invoke(self, prompt):
+        from modules.extraction import BATCH_SYSTEM_PROMPT
+        self.calls += 1
+        _sleep_ms(self.latency_ms)
+        if isinstance(prompt, list) and prompt[0].content == BATCH_SYSTEM_PROMPT:
+            n = len(prompt[1].content.splitlines()) - 1  # "today=..." + one numbered line per message
+            msg = self._Msg()
+            msg.content = json.dumps({"results": [json.loads(self._Msg.content)] * n})
+            return msg
+        return self._Msg()
+
+    def bind(self, **kwargs):
+        return self
+
+    def stream(self, prompt):
+        yield self.invoke(prompt)
+
+
+def install_stand_ins(args):
+    import server
+    from modules import search
+    from modules.utils import DataManager
+
+    FakeScraper.latency_ms = args.scrape_latency_ms
+    search.PakRailScraper = FakeScraper
+    DataManager.save_train_data = staticmethod(lambda *a, **k: None)  # no disk writes per search
+    if args.no_cache:
+        search.RESULT_CACHE.ttl = 0
+    if args.llm_latency_ms > 0:
+        server.ENGINE.llm = FakeLLM(args.llm_latency_ms)
+    if args.no_slot_model:
+        server.ENGINE.config.SLOT_MODEL_ENABLED = False  # every chatter turn goes to the LLM
+    return server
+
+
+# ---------------- Conversations ----------------
+def make_script(rng: random.Random, chatter_ratio: float):
+    fr, to = rng.sample(CITIES, 2)
+    steps = []
+    if rng.random() < chatter_ratio:
+        steps.append(("chatter", "acha theek hai"))  # nothing parseable -> LLM path unless the slot model is sure
+    steps += [
+        ("route", f"{fr.lower()} se {to.lower()}"),
+        ("date", rng.choice(["kal", "parso"])),
+        ("budget", rng.choice(["economy", "business", "ac"])),
+        ("time", rng.choice(["subah", "dopahar", "raat"])),
+        ("confirm_search", "haan"),
+    ]
+    return steps
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.turns = 0
+        self.conversations = 0
+
+    def add(self, stage, seconds, ok):
+        with self.lock:
+            self.turns += 1
+            self.latencies[stage].append(seconds)
+            if not ok:
+                self.errors[stage] += 1
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+def make_sender(args, server=None):
+    if args.mode == "inproc":
+        from server import ChatRequest
+
+        def send(message, session_id):
+            resp = server.chat(ChatRequest(message=message, sessionId=session_id), x_profile=None)
+            data = json.loads(resp.body)
+            return data["reply"], data["sessionId"]
+        return send
+
+    url = args.url.rstrip("/") + "/api/chat"
+
+    def send(message, session_id):
+        body = json.dumps({"message": message, "sessionId": session_id}).encode("utf-8")
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=args.timeout) as r:
+            data = json.loads(r.read())
+        return data["reply"], data["sessionId"]
+    return send
+
+
+async def run_conversation(loop, pool, send, stats, script, think_s):
+    session_id = None
+    for stage, message in script:
+        started = time.perf_counter()
+        ok = True
+        try:
+            reply, session_id = await loop.run_in_executor(pool, send, message, session_id)
+            ok = not any(m in reply for m in ERROR_MARKERS)
+            if stage == "confirm_search" and NO_RESULTS_MARKER in reply:
+                ok = False
+        except Exception:
+            ok = False
+        stats.add(stage, time.perf_counter() - started, ok)
+        if not ok and session_id is None:
+            break
+        if think_s:
+            await asyncio.sleep(random.expovariate(1.0 / think_s))
+    stats.conversations += 1
+
+
+async def drive(args, send):
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=args.workers)
+    rng = random.Random(args.seed)
+    stats = Stats()
+    tasks = []
+    started = time.perf_counter()
+    for _ in range(args.conversations):
+        script = make_script(rng, args.chatter_ratio)
+        tasks.append(asyncio.create_task(run_conversation(loop, pool, send, stats, script, args.think_ms / 1000.0)))
+        await asyncio.sleep(rng.expovariate(args.rate))  # Poisson arrivals
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    pool.shutdown(wait=False)
+    return stats, elapsed
+
+
+def report(stats, elapsed):
+    print(f"\nConversations: {stats.conversations}   Turns: {stats.turns}   Wall time: {elapsed:.1f}s")
+    print(f"Throughput: {stats.turns / elapsed:.1f} turns/s, {stats.conversations / elapsed:.1f} conversations/s\n")
+    print(f"{'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    all_lat, all_err = [], 0
+    for stage in ["chatter", "route", "date", "budget", "time", "confirm_search"]:
+        lat = stats.latencies.get(stage)
+        if not lat:
+            continue
+        all_lat += lat
+        all_err += stats.errors[stage]
+        print(f"{stage:<16}{len(lat):>8}{pct(lat, 50) * 1000:>10.1f}{pct(lat, 95) * 1000:>10.1f}"
+              f"{pct(lat, 99) * 1000:>10.1f}{stats.errors[stage]:>9}")
+    print(f"{'ALL':<16}{len(all_lat):>8}{pct(all_lat, 50) * 1000:>10.1f}{pct(all_lat, 95) * 1000:>10.1f}"
+          f"{pct(all_lat, 99) * 1000:>10.1f}{all_err:>9}")
+    print(f"\nError rate: {all_err / max(1, len(all_lat)) * 100:.2f}%")
+
+
+def start_local_server(app, port):
+    import uvicorn
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    srv = uvicorn.Server(config)
+    threading.Thread(target=srv.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not srv.started and time.time() < deadline:
+        time.sleep(0.05)
+    return srv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for /api/chat conversations")
+    parser.add_argument("--mode", choices=["inproc", "serve", "http"], default="inproc")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--port", type=int, default=8765, help="port for --mode serve")
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=20.0, help="new conversations per second")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="mean user think time between turns")
+    parser.add_argument("--workers", type=int, default=40, help="client threads (inproc: mimics the server threadpool)")
+    parser.add_argument("--scrape-latency-ms", type=float, default=500.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="0 keeps the LLM disabled")
+    parser.add_argument("--no-slot-model", action="store_true", help="disable the local slot model")
+    parser.add_argument("--chatter-ratio", type=float, default=0.2, help="share of conversations with an LLM-bound turn")
+    parser.add_argument("--no-cache", action="store_true", help="disable the result cache (every confirm scrapes)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_MODE", "json")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("PREFETCH_ENABLED", "0")
+
+    server = None
+    if args.mode in ("inproc", "serve"):
+        server = install_stand_ins(args)
+    if args.mode == "serve":
+        start_local_server(server.app, args.port)
+        args.url = f"http://127.0.0.1:{args.port}"
+
+    stats, elapsed = asyncio.run(drive(args, make_sender(args, server)))
+    report(stats, elapsed)
+    if server is not None and isinstance(server.ENGINE.llm, FakeLLM):
+        print(f"LLM calls: {server.ENGINE.llm.calls}")
+
+
+if __name__ == "__main__":
+    main()
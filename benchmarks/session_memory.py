@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Memory per N live chat sessions: old per-session TrainBookingAI layout vs SessionRecord.
+
+The "before" side is the real pre-engine TrainBookingAI, loaded from git (the
+parent of the commit that added this benchmark, or --baseline-ref). Without git
+history it falls back to LegacySession, a hand-built model of that class, and
+says so in the output.
+
+Usage: python benchmarks/session_memory.py [--sessions 100000] [--baseline-ref REF]
+"""
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.settings import Config  # noqa: E402
+from modules.utils import Logger  # noqa: E402
+from modules.sessions import SessionRecord, encode_session  # noqa: E402
+
+
+class LegacySession:
+    """Approximate shape of a pre-engine session (fallback when git history is unavailable)."""
+
+    def __init__(self, llm=None):
+        self.logger = Logger("TrainBookingAI")
+        self.config = Config()
+        self.state = {
+            "stage": "init",
+            "from_station": None,
+            "to_station": None,
+            "travel_date": None,
+            "budget": None,
+            "preferred_time": None,
+            "format_pref": None,
+        }
+        self.degrade_mode = False
+        self.llm_calls = 0
+        self.llm = llm
+
+
+def _git(*args) -> str:
+    return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def default_baseline_ref() -> str:
+    added = _git("log", "--format=%H", "--diff-filter=A", "-1", "--", "benchmarks/session_memory.py")
+    return f"{added}^"
+
+
+def load_baseline_agent(ref: str):
+    """TrainBookingAI class as it was at `ref` (its imports resolve against the current tree)."""
+    path = f"{ref}:modules/ai_agent.py"
+    module = types.ModuleType("baseline_ai_agent")
+    module.__file__ = path
+    exec(compile(_git("show", path), path, "exec"), module.__dict__)
+    return module.TrainBookingAI
+
+
+def _fill(state):
+    # mid-conversation values so strings are actually held
+    state["stage"] = "confirm"
+    state["from_station"] = "Karachi"
+    state["to_station"] = "Lahore"
+    state["travel_date"] = "2025-09-20"
+    state["budget"] = "Business Class"
+    state["preferred_time"] = "raat"
+
+
+def measure(factory, n):
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    live = []
+    for _ in range(n):
+        obj = factory()
+        _fill(obj if isinstance(obj, SessionRecord) else obj.state)
+        live.append(obj)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del live
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--baseline-ref", help="git ref of the pre-engine tree (default: found from history)")
+    args = parser.parse_args()
+    n = args.sessions
+
+    try:
+        ref = args.baseline_ref or default_baseline_ref()
+        legacy, label = load_baseline_agent(ref), f"baseline TrainBookingAI @ {_git('rev-parse', '--short', ref)}"
+    except (OSError, subprocess.CalledProcessError, SyntaxError, ImportError, AttributeError) as e:
+        print(f"Baseline agent not loadable from git ({e}); using LegacySession APPROXIMATION")
+        legacy, label = LegacySession, "APPROXIMATION: LegacySession model"
+
+    before = measure(legacy, n)
+    after = measure(SessionRecord, n)
+    rec = SessionRecord()
+    _fill(rec)
+
+    print(f"Live sessions:              {n:,}")
+    print(f"Before ({label}): {before / 1e6:8.1f} MB  ({before / n:6.0f} B/session)")
+    print(f"After  (SessionRecord):     {after / 1e6:8.1f} MB  ({after / n:6.0f} B/session)")
+    print(f"Serialized record:          {len(encode_session(rec))} B")
+
+
+if __name__ == "__main__":
+    main()
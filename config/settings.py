@@ -21,4 +21,131 @@ class Config:
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    ]
\ No newline at end of file
+    ]
+
+    # Search Cache / Prefetch Configuration
+    RESULT_CACHE_TTL = 900            # seconds a scraped result set stays fresh
+    RESULT_CACHE_MAX_ENTRIES = 2000
+    PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', '1') == '1'
+    PREFETCH_TOP_N = 20               # hottest (route, date) keys kept warm
+    PREFETCH_SCRAPES_PER_MINUTE = 6   # background scrape budget
+    PREFETCH_REFRESH_MARGIN = 120     # refresh this many seconds before expiry
+    PREFETCH_SLOW_SCRAPE_SECONDS = 15 # upstream considered slow above this
+    PREFETCH_HALF_LIFE = 1800         # popularity decay half-life (seconds)
+
+    # Offline Snapshot Configuration
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', 'data/timetable.snap')
+    SNAPSHOT_MAX_AGE = 24 * 3600      # older snapshots are ignored for serving
+    SNAPSHOT_RECHECK = 30             # seconds between checks for a rebuilt snapshot file
+    SNAPSHOT_DAYS = 7
+    SNAPSHOT_STATIONS = [
+        "Karachi", "Lahore", "Islamabad", "Rawalpindi", "Multan",
+        "Peshawar", "Quetta", "Faisalabad", "Hyderabad", "Sukkur",
+    ]
+
+    # API Configuration
+    GZIP_MIN_SIZE = 1024              # compress responses larger than this (bytes)
+    SEARCH_MAX_DAYS = 14
+
+    # Logging Configuration
+    LOG_MODE = os.getenv('LOG_MODE', 'console')   # "console" (colored, CLI) | "json" (server)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+    # Session Store Configuration
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')   # "memory" | "sqlite" | "redis"
+    SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', 'data/sessions.db')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_TTL = 6 * 3600            # idle conversations expire after this
+    SESSION_QUEUE_MAX_DEPTH = 4       # callers per session at once (running + waiting); more get 429
+    SESSION_QUEUE_WAIT = 30           # seconds a queued/duplicate turn waits before 429
+
+    # Fetch Record / Replay Configuration
+    HTTP_TIMEOUT = 10                 # requests tier timeout (seconds)
+    SCRAPER_FETCH_MODE = os.getenv('SCRAPER_FETCH_MODE', 'live')   # "live" | "record" | "replay"
+    SCRAPER_ARCHIVE_DIR = os.getenv('SCRAPER_ARCHIVE_DIR', 'data/fetch_archive')
+    SCRAPER_REPLAY_LATENCY_SCALE = float(os.getenv('SCRAPER_REPLAY_LATENCY_SCALE', '1.0'))   # 0 = no delay
+
+    # Shared Browser Configuration
+    SCRAPER_SHARED_BROWSER = os.getenv('SCRAPER_SHARED_BROWSER', '0') == '1'   # one Chromium, one tab per search
+    SCRAPER_MAX_TABS = int(os.getenv('SCRAPER_MAX_TABS', '8'))
+
+    # Adaptive Timeout / Hedging Configuration
+    LATENCY_WINDOW = 200              # recent fetches kept per tier
+    LATENCY_MIN_SAMPLES = 20          # below this, static timeouts are used and no hedging
+    LATENCY_TIMEOUT_MULTIPLIER = 2.0  # adaptive timeout = p99 * multiplier
+    LATENCY_MIN_TIMEOUT = 3           # never go below this (seconds)
+    HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', '1') == '1'
+    HEDGE_POOL_SIZE = 16              # primary fetches
+    HEDGE_BACKUP_POOL_SIZE = 8        # hedged HTTP backups, separate so primaries can't starve them
+
+    # Rate Limit / Retry Configuration (per upstream host, shared by all sessions)
+    HOST_RATE_PER_SECOND = 2.0        # token bucket refill rate
+    HOST_BURST = 4
+    HOST_MAX_CONCURRENCY = 4
+    HOST_MAX_WAIT = 20                # give up waiting for a slot after this (seconds)
+    RETRY_BASE_DELAY = 0.5            # exponential backoff base, full jitter
+    RETRY_MAX_DELAY = 8
+    RETRY_AFTER_MAX = 60              # cap on honoured Retry-After
+
+    # HTTP Cache Configuration (requests tier; directory is shared by all scrapers/processes)
+    HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', '1') == '1'
+    HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', 'data/http_cache')
+    HTTP_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    HTTP_CACHE_HEURISTIC_MAX = 86400  # cap for Last-Modified heuristic freshness (seconds)
+
+    # Resource Blocking Configuration (headless Chrome, via DevTools)
+    RESOURCE_BLOCKING_ENABLED = os.getenv('RESOURCE_BLOCKING_ENABLED', '1') == '1'
+    BLOCK_RESOURCE_TYPES = [t.strip() for t in os.getenv('BLOCK_RESOURCE_TYPES', 'image,font,stylesheet,media').split(',') if t.strip()]
+    BLOCK_URL_PATTERNS = [
+        '*google-analytics.com*',
+        '*googletagmanager.com*',
+        '*doubleclick.net*',
+        '*googlesyndication.com*',
+        '*facebook.net*',
+        '*hotjar.com*',
+    ] + [p.strip() for p in os.getenv('BLOCK_URL_PATTERNS', '').split(',') if p.strip()]
+
+    # Speculative Search Configuration (chat starts the search before "haan")
+    SPECULATIVE_SEARCH_ENABLED = os.getenv('SPECULATIVE_SEARCH_ENABLED', '1') == '1'
+    SPECULATIVE_WORKERS = 8
+    SPECULATIVE_TTL = 300             # finished, unclaimed results are dropped after this (seconds)
+    SPECULATIVE_WAIT = 90             # confirm turn waits this long for the in-flight search
+
+    # LLM Extraction Configuration
+    LLM_EXTRACT_MAX_TOKENS = 120      # a filled slot object is ~60 tokens
+    LLM_STREAM = os.getenv('LLM_STREAM', '1') == '1'          # stop reading at the first complete JSON object
+    LLM_JSON_MODE = os.getenv('LLM_JSON_MODE', '1') == '1'    # response_format=json_object (disable for models without it)
+    LLM_BATCH_ENABLED = os.getenv('LLM_BATCH_ENABLED', '1') == '1'   # micro-batch concurrent extractions
+    LLM_BATCH_WINDOW_MS = 30
+    LLM_BATCH_MAX = 16
+    LLM_BATCH_WORKERS = 8
+    LLM_BATCH_WAIT = 25               # caller gives up after this (client timeout is 18s)
+
+    # Local Slot Model Configuration (CPU-only tagger in front of the LLM)
+    SLOT_MODEL_ENABLED = os.getenv('SLOT_MODEL_ENABLED', '1') == '1'
+    SLOT_MODEL_PATH = os.getenv('SLOT_MODEL_PATH', 'data/slot_model.json')
+    SLOT_MODEL_MIN_CONFIDENCE = 0.85  # below this the remote LLM is asked
+
+    # Fare History Configuration (append-only columnar store)
+    FARE_HISTORY_ENABLED = os.getenv('FARE_HISTORY_ENABLED', '1') == '1'
+    FARE_HISTORY_DIR = os.getenv('FARE_HISTORY_DIR', 'data/fare_history')
+
+    # CLI Display Configuration
+    DISPLAY_PAGE_SIZE = int(os.getenv('DISPLAY_PAGE_SIZE', '20'))  # rows per page for saved data
+
+    # Profiling Configuration (opt-in per request; nothing runs when both are off)
+    PROFILE_ADMIN_TOKEN = os.getenv('PROFILE_ADMIN_TOKEN', '')  # X-Profile header value; also guards /api/profiles
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # fraction of requests profiled
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+    PROFILE_INTERVAL_MS = 5
+    PROFILE_TRACEMALLOC_FRAMES = 1
+    PROFILE_TOP_ALLOCS = 25
+
+    # Scrape Queue Configuration (scraping outside the API process)
+    SCRAPE_QUEUE_BACKEND = os.getenv('SCRAPE_QUEUE_BACKEND', 'inline')   # "inline" | "memory" | "sqlite"
+    SCRAPE_QUEUE_PATH = os.getenv('SCRAPE_QUEUE_PATH', 'data/scrape_queue.db')
+    SCRAPE_WORKERS = int(os.getenv('SCRAPE_WORKERS', '2'))   # worker processes (threads for "memory")
+    SCRAPE_WORKER_MAX_JOBS = int(os.getenv('SCRAPE_WORKER_MAX_JOBS', '200'))   # recycle a worker after this many
+    SCRAPE_JOB_TIMEOUT = 60           # lease: a running job older than this is retried elsewhere
+    SCRAPE_JOB_ATTEMPTS = 2           # attempts * lease must fit in SCRAPE_JOB_WAIT
+    SCRAPE_JOB_WAIT = 150             # how long the API waits for a result
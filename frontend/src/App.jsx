@@ -50,7 +50,8 @@ export default function App() {
       const assistantMsg = {
         id: crypto.randomUUID(),
         role: 'assistant',
-        content: data.reply || '...'
+        content: data.reply || '...',
+        results: data.results || null
       }
       setMessages(prev => [...prev, assistantMsg])
     } catch (err) {
@@ -109,7 +110,7 @@ export default function App() {
 
       <main className="chat-container">
         {messages.map(m => (
-          <MessageBubble key={m.id} role={m.role} content={m.content} />
+          <MessageBubble key={m.id} role={m.role} content={m.content} results={m.results} />
         ))}
 
         {loading && (
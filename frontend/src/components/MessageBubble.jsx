@@ -1,12 +1,14 @@
 import React from 'react'
+import ResultsTable from './ResultsTable.jsx'
 
-export default function MessageBubble({ role, content }) {
+export default function MessageBubble({ role, content, results }) {
   const isUser = role === 'user'
   return (
     <div className={`bubble ${isUser ? 'user' : 'assistant'}`}>
       {!isUser && <div className="avatar">🤖</div>}
       <div className="bubble-content">
         <div className="text" dangerouslySetInnerHTML={{ __html: escapeToHTML(content) }}></div>
+        {!isUser && <ResultsTable results={results} />}
         <div className="meta">
           {isUser ? 'You' : 'Assistant'}
         </div>
@@ -0,0 +1,36 @@
+import React from 'react'
+
+const COLUMNS = [
+  ['name', 'Train'],
+  ['travel_date', 'Date'],
+  ['departure_time', 'Depart'],
+  ['arrival_time', 'Arrive'],
+  ['economy_fare', 'Economy'],
+  ['business_fare', 'Business'],
+  ['ac_fare', 'AC'],
+  ['stops', 'Stops']
+]
+
+export default function ResultsTable({ results }) {
+  if (!results?.length) return null
+  return (
+    <div className="results-wrap">
+      <table className="results">
+        <thead>
+          <tr>
+            <th>No</th>
+            {COLUMNS.map(([key, label]) => <th key={key}>{label}</th>)}
+          </tr>
+        </thead>
+        <tbody>
+          {results.map((r, i) => (
+            <tr key={`${r.travel_date}-${r.id}`}>
+              <td>{i + 1}</td>
+              {COLUMNS.map(([key]) => <td key={key}>{r[key] ?? '-'}</td>)}
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  )
+}
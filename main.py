@@ -128,11 +128,12 @@ Aap kya karna chahte hain? (1-5): """
         """Show previously saved train data"""
         try:
             from modules.utils import DataManager
-            saved_data = DataManager.load_train_data()
+            # records are parsed while paging, so large exports start printing at once
+            self.display.console.print("\n[green]📊 Saved trains:[/green]")
+            shown = self.display.display_train_pages(DataManager.iter_train_data())
             
-            if saved_data:
-                self.display.console.print(f"\n[green]📊 {len(saved_data)} saved trains found:[/green]")
-                self.display.display_train_results(saved_data)
+            if shown:
+                self.display.console.print(f"\n[green]📊 {shown} saved trains dikhaye gaye[/green]")
             else:
                 self.display.console.print("\n[yellow]📊 Koi saved data nahi hai![/yellow]")
                 
@@ -206,6 +207,11 @@ Aap kya karna chahte hain? (1-5): """
 
 def main():
     """Application entry point"""
+    # Non-interactive subcommand: python main.py bulk routes.csv -o fares.jsonl
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        from modules.bulk_search import main as bulk_main
+        sys.exit(bulk_main(sys.argv[2:]))
+
     try:
         app = TrainBookingApp()
         app.run()
@@ -4,12 +4,18 @@
 
 import json
 import re
+import threading
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from config.settings import Config
+from modules.extraction import extract_slots, get_batcher
+from modules.slot_model import get_slot_model, tokenize
 from modules.utils import Logger
-from modules.scraper import PakRailScraper
+from modules.search import (
+    claim_speculative, discard_speculative, make_key, search_trains, start_speculative, train_details,
+)
+from modules.sessions import SessionRecord
 
 # Optional LLM (OpenRouter via OpenAI-compatible endpoint using LangChain)
 try:
@@ -17,6 +23,32 @@ try:
 except Exception:
     ChatOpenAI = None  # allow running without langchain_openai installed
 
+# One LLM client per process; sessions are rebuilt per request in the API
+_llm_client: Optional[Any] = None
+_llm_ready = False
+_llm_lock = threading.Lock()
+
+
+def _shared_llm(config: Config, logger: Logger) -> Optional[Any]:
+    global _llm_client, _llm_ready
+    if _llm_ready:
+        return _llm_client
+    with _llm_lock:
+        if not _llm_ready:
+            if ChatOpenAI and getattr(config, "OPENROUTER_API_KEY", None):
+                try:
+                    _llm_client = ChatOpenAI(
+                        model=config.AI_MODEL,
+                        temperature=0.3,
+                        openai_api_key=config.OPENROUTER_API_KEY,
+                        base_url="https://openrouter.ai/api/v1",
+                        timeout=18,
+                    )
+                except Exception as e:
+                    logger.warning("LLM init failed, going offline: %s", e)
+            _llm_ready = True
+    return _llm_client
+
 
 class TrainBookingAI:
     """
@@ -32,41 +64,52 @@ class TrainBookingAI:
 
     LLM_MAX_CALLS_PER_SESSION = 2
 
-    def __init__(self):
-        self.logger = Logger("TrainBookingAI")
-        self.config = Config()
+    __slots__ = ("logger", "config", "llm", "state", "structured_output", "last_structured", "claimed_spec")
 
-        self.state: Dict[str, Any] = {
-            "stage": "init",
-            "from_station": None,
-            "to_station": None,
-            "travel_date": None,     # YYYY-MM-DD
-            "budget": None,          # "Economy Class" | "Business Class" | "AC Class" | "Rs. 3000"
-            "preferred_time": None,  # "subah" | "dopahar" | "raat"
-            "format_pref": None,     # optional: "table" | "list" | "json"
-        }
-
-        # LLM setup (optional)
-        self.degrade_mode = False
-        self.llm_calls = 0
-        self.llm: Optional[Any] = None
-        if ChatOpenAI and getattr(self.config, "OPENROUTER_API_KEY", None):
-            try:
-                self.llm = ChatOpenAI(
-                    model=self.config.AI_MODEL,
-                    temperature=0.3,
-                    openai_api_key=self.config.OPENROUTER_API_KEY,
-                    base_url="https://openrouter.ai/api/v1",
-                    timeout=18,
-                )
-            except Exception as e:
-                self.logger.warning(f"LLM init failed, going offline: {e}")
-                self.degrade_mode = True
+    def __init__(self, record: Optional[SessionRecord] = None, engine: Optional["ConversationEngine"] = None):
+        # Shared parts come from the engine (API); the CLI builds its own
+        if engine is not None:
+            self.logger, self.config, self.llm = engine.logger, engine.config, engine.llm
         else:
-            self.degrade_mode = True  # no LLM available
+            self.logger = Logger("TrainBookingAI")
+            self.config = Config()
+            self.llm: Optional[Any] = _shared_llm(self.config, self.logger)
+
+        # Per-conversation state lives in a compact SessionRecord
+        self.state: SessionRecord = record if record is not None else SessionRecord(degrade_mode=self.llm is None)
+
+        # API callers (server.py) render json results client-side
+        self.structured_output = False
+        self.last_structured: Optional[list] = None
+        self.claimed_spec = None  # speculative key this turn already claimed (holder released)
+
+    # LLM counters are part of the session record
+    @property
+    def llm_calls(self) -> int:
+        return self.state.llm_calls
+
+    @llm_calls.setter
+    def llm_calls(self, value: int):
+        self.state.llm_calls = value
+
+    @property
+    def degrade_mode(self) -> bool:
+        return self.state.degrade_mode
+
+    @degrade_mode.setter
+    def degrade_mode(self, value: bool):
+        self.state.degrade_mode = value
 
     # ---------------- Public API ----------------
     def process_user_input(self, user_input: str) -> str:
+        previous_spec = self.state.spec_key  # reset() inside the turn clears it
+        self.claimed_spec = None
+        reply = self._run_turn(user_input)
+        if self.config.SPECULATIVE_SEARCH_ENABLED:
+            self._sync_speculative(previous_spec)
+        return reply
+
+    def _run_turn(self, user_input: str) -> str:
         try:
             txt = (user_input or "").strip()
             if not txt:
@@ -81,6 +124,13 @@ class TrainBookingAI:
             if any(w in lw for w in ["help", "madad", "kaise"]):
                 return "Rehnumai: Bas seedhe alfaaz mein batayein. 'reset' se naya start. Ab current sawal ka jawab dein."
 
+            # Follow-up on shown results ("2", a train name): answer before the
+            # (possibly LLM-backed) slot extraction, which has nothing to add here
+            if self.state["stage"] == "results_shown":
+                found = self.state.find_result(txt)
+                if found:
+                    return self._format_details(*found)
+
             # Soft reset if user starts brand-new route
             self._soft_reset_if_new_route(txt)
 
@@ -173,6 +223,8 @@ class TrainBookingAI:
                     self.reset_conversation()
                     self.state["stage"] = "from_city"
                     return self._greet_intro()
+                if self.state.results:
+                    return f"Tafseel ke liye train ka number (1-{len(self.state.results)}) batayein, ya naye search ke liye 'reset' likhein."
                 return "Naya search karna ho to 'reset' likhein."
 
             # fallback
@@ -180,21 +232,32 @@ class TrainBookingAI:
             return self._greet_intro()
 
         except Exception as e:
-            self.logger.error(f"process_user_input error: {e}")
+            self.logger.error("process_user_input error: %s", e)
             return "Kuch masla aa gaya. 'reset' karke dobara koshish karein."
 
+    def _current_search_key(self):
+        if self.state["stage"] == "results_shown" or not self._has_all_required(self.state):
+            return None
+        return make_key(self.state["from_station"], self.state["to_station"],
+                        self.state["travel_date"], self.state["preferred_time"])
+
+    def _sync_speculative(self, previous):
+        """Keep exactly one speculative search per session, matching the current slots."""
+        try:
+            key = self._current_search_key()
+            # a claimed search has already given up this session's holder
+            if previous and previous != key and previous != self.claimed_spec:
+                discard_speculative(previous)
+            if key and key != previous:
+                start_speculative(key)
+            self.state.spec_key = key
+        except Exception as e:
+            self.logger.warning("Speculative search sync fail: %s", e)
+            self.state.spec_key = None
+
     def reset_conversation(self):
-        self.state = {
-            "stage": "init",
-            "from_station": None,
-            "to_station": None,
-            "travel_date": None,
-            "budget": None,
-            "preferred_time": None,
-            "format_pref": None,
-        }
-        self.degrade_mode = False
-        self.llm_calls = 0
+        # clears slots and LLM counters (degrade_mode back to False)
+        self.state.reset()
 
     # --------------- Soft reset when user starts a new route ---------------
     def _soft_reset_if_new_route(self, user_input: str):
@@ -231,9 +294,15 @@ class TrainBookingAI:
 
     # --------------- Ingestion (free-form) ---------------
     def _ingest(self, user_input: str) -> bool:
-        """Local parse first; if nothing new & LLM allowed -> single JSON extract."""
+        """Local model + regex parse first; if nothing new, model unsure & LLM allowed -> single JSON extract."""
         new_set = False
 
+        # Local model first (handles multi-word cities and bare replies); confident slots only.
+        # Its overall confidence also decides below whether the LLM is worth a call.
+        prediction = self._model_predict(user_input)
+        if prediction and self._apply_model_slots(prediction, user_input):
+            new_set = True
+
         # Route in one line: "karachi se lahore"
         fr, to = self._local_extract_route(user_input)
         if fr and not self.state["from_station"]:
@@ -280,8 +349,11 @@ class TrainBookingAI:
             if fmt:
                 self.state["format_pref"] = fmt
 
-        # If nothing new & LLM available -> single JSON parse attempt
-        if (not new_set) and (not self.degrade_mode) and self.llm and self.llm_calls < self.LLM_MAX_CALLS_PER_SESSION:
+        model_sure = bool(prediction) and prediction["confidence"] >= self.config.SLOT_MODEL_MIN_CONFIDENCE
+
+        # If nothing new, model unsure & LLM available -> single JSON parse attempt
+        if (not new_set) and (not model_sure) and (not self.degrade_mode) and self.llm \
+                and self.llm_calls < self.LLM_MAX_CALLS_PER_SESSION:
             try:
                 parsed = self._llm_extract(user_input)
                 if parsed:
@@ -294,40 +366,59 @@ class TrainBookingAI:
                             self.state[k] = v
                             new_set = True
             except Exception as e:
-                self.logger.warning(f"LLM extract failed -> offline: {e}")
+                self.logger.warning("LLM extract failed -> offline: %s", e)
                 self.degrade_mode = True
 
         return new_set
 
+    def _model_predict(self, user_input: str) -> Optional[Dict[str, Any]]:
+        if not self.config.SLOT_MODEL_ENABLED:
+            return None
+        try:
+            return get_slot_model().predict(user_input)
+        except Exception as e:
+            self.logger.warning("Slot model fail: %s", e)
+            return None
+
+    def _apply_model_slots(self, prediction: Dict[str, Any], user_input: str = "") -> bool:
+        """Fill empty slots from confident model spans, normalized like the regex path."""
+        new_set = False
+        words = " ".join(tokenize(user_input))
+        threshold = self.config.SLOT_MODEL_MIN_CONFIDENCE
+        for slot, span in prediction["slots"].items():
+            if prediction["slot_confidence"].get(slot, 0.0) < threshold:
+                continue
+            if slot in ("from_station", "to_station"):
+                value = " ".join(w.title() for w in span.split())
+                other = "to_station" if slot == "from_station" else "from_station"
+                # a bare city reply ("multan") fills whichever city is missing; a
+                # city with a marker ("karachi se") keeps the tag the model gave it
+                if self.state[slot] and not self.state[other] and span == words:
+                    slot, other = other, slot
+                if str(self.state[other] or "").lower() == value.lower():
+                    continue
+            elif slot == "travel_date":
+                value = self._local_extract_date(span)
+            elif slot == "preferred_time":
+                value = self._local_extract_time(span)
+            elif slot == "budget":
+                value = self._local_extract_budget(span)
+            else:
+                value = self._local_extract_format(span)
+            if value and not self.state[slot]:
+                self.state[slot] = value
+                new_set = slot != "format_pref"
+        return new_set
+
     def _llm_extract(self, user_input: str) -> Optional[Dict[str, Any]]:
         """Single JSON extraction call. Increases llm_calls. Raises on non-JSON to trigger offline."""
         self.llm_calls += 1
         today = datetime.now().strftime("%Y-%m-%d")
-        sys = f"""
-Aap Pakistani railway booking assistant hain. User ke free-form message se maloomat nikaalein.
-
-Normalization:
-- travel_date: YYYY-MM-DD (aaj={today}, kal=+1, parso=+2; past avoid)
-- preferred_time: "subah"|"dopahar"|"raat" (sham/shaam/evening/night -> raat)
-- budget: "Economy Class"|"Business Class"|"AC Class"|"Rs. <amount>"
-- format_pref: "list"|"table"|"json" (optional)
-
-Output ONLY JSON:
-{{
-  "from_station": null|"City",
-  "to_station": null|"City",
-  "travel_date": null|"YYYY-MM-DD",
-  "budget": null|"Economy Class|Business Class|AC Class|Rs. 3000",
-  "preferred_time": null|"subah|dopahar|raat",
-  "format_pref": null|"list|table|json"
-}}
-"""
-        prompt = f"{sys}\nUser message:\n{user_input}\n\nOutput ONLY the JSON object."
-
-        resp = self.llm.invoke(prompt)
-        # LangChain returns an AIMessage with .content
-        content = getattr(resp, "content", None) or str(resp)
-        data = self._safe_json_parse(content)
+        if self.config.LLM_BATCH_ENABLED:
+            # shares one LLM call with whatever other sessions are extracting right now
+            data = get_batcher(self.llm).extract(user_input, today, timeout=self.config.LLM_BATCH_WAIT)
+        else:
+            data = extract_slots(self.llm, user_input, today)
         if not data:
             raise RuntimeError("LLM non-JSON extraction")
         return data
@@ -335,14 +426,18 @@ Output ONLY JSON:
     # --------------- Search + Format ---------------
     def _search_and_format(self) -> str:
         try:
-            scraper = PakRailScraper()
-            results = scraper.scrape_train_info(
-                self.state["from_station"],
-                self.state["to_station"],
-                self.state["travel_date"],
-                self.state["preferred_time"],
-            )
+            key = make_key(self.state["from_station"], self.state["to_station"],
+                           self.state["travel_date"], self.state["preferred_time"])
+            # Attach to the search started while the user was reading the summary
+            results = None
+            if self.state.spec_key == key:
+                results = claim_speculative(key)
+                self.claimed_spec = key
+            self.state.spec_key = None
+            if results is None:
+                results = search_trains(*key)
             self.state["stage"] = "results_shown"
+            self.state.set_results(key, results or [])
 
             d = self.state["travel_date"]
             try:
@@ -360,6 +455,13 @@ Output ONLY JSON:
 
             fmt = (self.state.get("format_pref") or "list").lower()
             if fmt == "json":
+                if self.structured_output:
+                    # rows travel as typed objects; only a short header as text
+                    self.last_structured = results
+                    return (
+                        f"{len(results)} trains mili hain: {self.state['from_station']} → {self.state['to_station']}\n"
+                        f"Date: {d_fmt} | Time: {self.state['preferred_time']} | Budget: {self.state['budget']}"
+                    )
                 return json.dumps({"results": results}, ensure_ascii=False, indent=2)
             if fmt == "table":
                 return self._format_table(results, d_fmt)
@@ -380,9 +482,39 @@ Output ONLY JSON:
             return "\n".join(lines)
 
         except Exception as e:
-            self.logger.error(f"search error: {e}")
+            self.logger.error("search error: %s", e)
             return "Search ke dauran technical masla aa gaya. Bara-e-meharbani thori dair baad dobara koshish karein."
 
+    def _format_details(self, number: int, row: Dict[str, Any]) -> str:
+        """Row data is already on the session; stops/seats are fetched for this one train only."""
+        lines = [
+            f"{number}. {row.get('name','Unknown')} ({row.get('train_type') or '-'}, {row.get('status') or '-'})",
+            f"   Waqt: {row.get('departure_time','-')} → {row.get('arrival_time','-')} ({row.get('duration','-')})",
+            f"   Fares: Economy {row.get('economy_fare','-')} | Business {row.get('business_fare','-')} | AC {row.get('ac_fare','-')}",
+        ]
+        try:
+            details = train_details(self.state.results_key, row) or {}
+        except Exception as e:
+            self.logger.warning("Train details fetch fail: %s", e)
+            details = {}
+
+        seats = details.get("seats")
+        if seats:
+            lines.append(f"   Seats: Economy {seats.get('economy')} | Business {seats.get('business')} | AC {seats.get('ac')}")
+        else:
+            lines.append(f"   Seats: {row.get('available_seats') or '-'}")
+        stops = details.get("stops")
+        if stops:
+            lines.append("   Stops:")
+            for st in stops:
+                lines.append(f"     • {st['station']}  {st['arrival']} → {st['departure']}")
+        elif stops is not None:
+            lines.append("   Non-stop")
+        else:
+            lines.append(f"   Stops: {row.get('stops','-')}")
+        lines.append("\nKisi aur train ki tafseel ke liye number batayein, ya naye search ke liye 'reset' likhein.")
+        return "\n".join(lines)
+
     # --------------- Tone / Prompts ---------------
     def _greet_intro(self) -> str:
         return "Assalam-o-Alaikum. Main aapki booking mein madad karunga. Pehle departure shehar batayein (misal: Karachi, Lahore, Islamabad)."
@@ -439,23 +571,6 @@ Output ONLY JSON:
         return f"Departure aur destination ek hi shehar ({city}) nahi ho sakte. Bara-e-meharbani mukhtalif destination batayein."
 
     # --------------- Helpers: local parsing ---------------
-    @staticmethod
-    def _safe_json_parse(text: str) -> Optional[Dict[str, Any]]:
-        if not text:
-            return None
-        t = str(text).strip()
-        # strip potential leading 'json' and code fences
-        t = re.sub(r'^\s*json\s*', '', t, flags=re.I).strip()
-        t = re.sub(r'^\s*```(?:json)?\s*', '', t, flags=re.I)
-        t = re.sub(r'\s*```\s*$', '', t)
-        m = re.search(r'{.*}', t, flags=re.S)
-        if not m:
-            return None
-        try:
-            return json.loads(m.group(0))
-        except Exception:
-            return None
-
     @staticmethod
     def _norm(s: str) -> str:
         return re.sub(r"\s+", " ", (s or "")).strip().lower()
@@ -604,6 +719,28 @@ Output ONLY JSON:
         return "\n".join(lines)
 
 
+class ConversationEngine:
+    """
+    Shared, stateless turn processor for the API.
+    Logger/Config/LLM client are held once; each conversation is just a SessionRecord.
+    """
+
+    def __init__(self):
+        self.logger = Logger("TrainBookingAI")
+        self.config = Config()
+        self.llm: Optional[Any] = _shared_llm(self.config, self.logger)
+
+    def new_session(self) -> SessionRecord:
+        return SessionRecord(degrade_mode=self.llm is None)
+
+    def process(self, record: SessionRecord, user_input: str, structured: bool = False) -> Tuple[str, Optional[list]]:
+        """Runs one turn, mutating `record`. Returns (reply, structured results or None)."""
+        turn = TrainBookingAI(record, engine=self)
+        turn.structured_output = structured
+        reply = turn.process_user_input(user_input)
+        return reply, turn.last_structured
+
+
 if __name__ == "__main__":
     bot = TrainBookingAI()
     print(bot.process_user_input("karachi jana hai"))
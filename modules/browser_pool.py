@@ -0,0 +1,190 @@
+# modules/browser_pool.py
+# One shared headless Chromium; each search runs in its own browser context + tab.
+#
+# - Isolation: every tab gets a fresh CDP browser context (own cookies, storage, cache)
+# - Concurrency: the driver uses pageLoadStrategy=none; navigation is started with a
+#   short command and then polled, so the WebDriver command lock is only held for
+#   milliseconds and many tabs load in parallel
+# - Per-tab deadline; a crashed/hung tab only disposes its own context
+# - If the browser process itself dies it is recreated on the next tab request
+
+import atexit
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from config.settings import Config
+from modules import resource_block
+from modules.utils import Logger
+
+
+class BrowserTab:
+    def __init__(self, browser: "SharedBrowser", handle: str, context_id: str):
+        self.browser = browser
+        self.handle = handle
+        self.context_id = context_id
+
+    def _run(self, fn: Callable[[Any], Any]):
+        """Run one WebDriver command against this tab under the shared command lock."""
+        with self.browser.command_lock:
+            driver = self.browser.driver
+            driver.switch_to.window(self.handle)
+            return fn(driver)
+
+    def get(self, url: str, timeout: float = Config.PAGE_LOAD_TIMEOUT, poll: float = 0.1) -> str:
+        """Navigate and return page source once the document is complete (or raise TimeoutException)."""
+        self._run(lambda d: d.execute_script("window.location.href = arguments[0];", url))
+        deadline = time.time() + timeout
+        while True:
+            href = self._run(lambda d: d.execute_script(
+                "return document.readyState === 'complete' && location.href !== 'about:blank' && location.href;"))
+            if href and href.startswith("chrome-error:"):
+                # navigation by script doesn't raise; Chrome shows its network error page instead
+                source = self._run(lambda d: d.page_source)
+                code = re.search(r"(?:net::)?(ERR_[A-Z_]+)", source)
+                raise WebDriverException(f"net::{code.group(1) if code else 'ERR_FAILED'} loading {url}")
+            if href:
+                return self._run(lambda d: d.page_source)
+            if time.time() >= deadline:
+                raise TimeoutException(f"Tab load timeout after {timeout}s: {url}")
+            time.sleep(poll)
+
+
+class SharedBrowser:
+    def __init__(self, driver_factory: Callable[[], Any], max_tabs: int = Config.SCRAPER_MAX_TABS):
+        self.logger = Logger("SharedBrowser")
+        self.driver_factory = driver_factory
+        self.driver = None
+        self.command_lock = threading.RLock()
+        self._slots = threading.BoundedSemaphore(max_tabs)
+        self.max_tabs = max_tabs
+        self.open_tabs = 0
+        self.restarts = 0
+        self.tab_failures = 0
+        self._traffic = {}  # tab handle -> PageTraffic; one performance log is shared by all tabs
+        self._live_handles = set()
+
+    def _ensure_driver(self):
+        with self.command_lock:
+            if self.driver is not None:
+                try:
+                    self.driver.window_handles  # cheap liveness probe
+                    return self.driver
+                except WebDriverException:
+                    self.logger.warning("Shared browser mar gaya, dobara start kar rahe hain")
+                    self._quit_driver()
+                    self.restarts += 1
+            self.driver = self.driver_factory()
+            if self.driver is None:
+                raise WebDriverException("Shared browser start nahi ho saka")
+            return self.driver
+
+    def _open(self) -> BrowserTab:
+        with self.command_lock:
+            driver = self._ensure_driver()
+            home = driver.current_window_handle
+            ctx = driver.execute_cdp_cmd("Target.createBrowserContext", {"disposeOnDetach": False})["browserContextId"]
+            target = driver.execute_cdp_cmd(
+                "Target.createTarget", {"url": "about:blank", "browserContextId": ctx})["targetId"]
+            # ChromeDriver window handles are CDP target ids; wait until it sees the new tab
+            deadline = time.time() + 5
+            while target not in driver.window_handles:
+                if time.time() >= deadline:
+                    raise WebDriverException("Naya tab ChromeDriver ko nazar nahi aaya")
+                time.sleep(0.05)
+            if Config.RESOURCE_BLOCKING_ENABLED:
+                driver.switch_to.window(target)
+                resource_block.apply(driver)  # block list is per target
+            driver.switch_to.window(home)
+            self.open_tabs += 1
+            self._live_handles.add(target)
+            return BrowserTab(self, target, ctx)
+
+    def _close(self, tab: BrowserTab):
+        with self.command_lock:
+            self.open_tabs -= 1
+            self._live_handles.discard(tab.handle)
+            self._traffic.pop(tab.handle, None)
+            driver = self.driver
+            if driver is None:
+                return
+            for cmd, params in (
+                ("Target.closeTarget", {"targetId": tab.handle}),
+                ("Target.disposeBrowserContext", {"browserContextId": tab.context_id}),
+            ):
+                try:
+                    driver.execute_cdp_cmd(cmd, params)
+                except WebDriverException:
+                    pass  # tab/context already gone (crash) - nothing else to clean
+            try:
+                driver.switch_to.window(driver.window_handles[0])
+            except (WebDriverException, IndexError):
+                pass
+
+    def page_traffic(self, tab: BrowserTab) -> "resource_block.PageTraffic":
+        """Drain the shared performance log, route entries to their tabs, return (and reset) this tab's share."""
+        with self.command_lock:
+            try:
+                resource_block.route_log(self.driver.get_log("performance"), self._traffic)
+            except WebDriverException:
+                pass
+            # late entries of already-closed tabs would otherwise accumulate forever
+            for handle in [h for h in self._traffic if h not in self._live_handles]:
+                del self._traffic[handle]
+            return self._traffic.pop(tab.handle, None) or resource_block.PageTraffic()
+
+    @contextmanager
+    def tab(self, wait_for_slot: float = Config.PAGE_LOAD_TIMEOUT):
+        """Borrow an isolated tab; blocks while max_tabs are busy."""
+        if not self._slots.acquire(timeout=wait_for_slot):
+            raise TimeoutException("Shared browser ke saare tabs busy hain")
+        tab = None
+        try:
+            tab = self._open()
+            yield tab
+        except Exception:
+            self.tab_failures += 1
+            raise
+        finally:
+            if tab is not None:
+                self._close(tab)
+            self._slots.release()
+
+    def _quit_driver(self):
+        try:
+            if self.driver:
+                self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
+
+    def quit(self):
+        with self.command_lock:
+            self._quit_driver()
+
+    def stats(self):
+        return {
+            "open_tabs": self.open_tabs,
+            "max_tabs": self.max_tabs,
+            "restarts": self.restarts,
+            "tab_failures": self.tab_failures,
+            "alive": self.driver is not None,
+        }
+
+
+_shared: Optional[SharedBrowser] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_browser(driver_factory: Callable[[], Any]) -> SharedBrowser:
+    """Process-wide shared browser; the factory is only used to (re)start Chromium."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SharedBrowser(driver_factory)
+            atexit.register(_shared.quit)
+        return _shared
@@ -0,0 +1,191 @@
+# modules/bulk_search.py
+# Non-interactive bulk search (nightly fare sweeps):
+#
+#   python main.py bulk routes.csv -o fares.jsonl --concurrency 8
+#   python main.py bulk routes.jsonl -o fares.csv --format csv --checkpoint sweep.ckpt
+#
+# Input rows (CSV header or JSONL keys): from_station, to_station, travel_date,
+# optional preferred_time. Results are written as each query finishes (JSONL: one
+# object per query, CSV: one row per train). The checkpoint file gets one line per
+# finished query *after* its output is flushed, so rerunning the same command skips
+# finished work; a crash can at worst repeat the one query in flight at that moment.
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+from modules.prefetch import SearchKey
+from modules.search import make_key, scrape_and_store, search_trains
+from modules.utils import Logger
+
+logger = Logger("BulkSearch")
+
+QUERY_FIELDS = ("from_station", "to_station", "travel_date", "preferred_time")
+ROW_FIELDS = (
+    "id", "name", "departure_time", "arrival_time", "duration", "economy_fare", "business_fare",
+    "ac_fare", "stops", "available_seats", "train_type", "status",
+)
+# accepted spellings in input files
+_ALIASES = {"from": "from_station", "to": "to_station", "date": "travel_date", "time": "preferred_time"}
+
+
+def key_id(key: SearchKey) -> str:
+    return "|".join(key)
+
+
+# ---------------- Input ----------------
+def _normalise(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {_ALIASES.get(k.strip().lower(), k.strip().lower()): v for k, v in row.items() if k}
+
+
+def read_queries(path: str) -> Iterator[SearchKey]:
+    """Yields search keys lazily; bad rows are logged and skipped."""
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", newline="")
+    try:
+        if path.endswith(".jsonl") or path.endswith(".ndjson"):
+            rows = (json.loads(line) for line in stream if line.strip())
+        else:
+            rows = csv.DictReader(stream)
+        for n, row in enumerate(rows, 1):
+            row = _normalise(row)
+            if not all(row.get(k) for k in QUERY_FIELDS[:3]):
+                logger.warning("Row %s skip: from_station/to_station/travel_date missing", n)
+                continue
+            yield make_key(row["from_station"], row["to_station"], row["travel_date"], row.get("preferred_time"))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def load_checkpoint(path: Optional[str]) -> set:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+# ---------------- Output ----------------
+class ResultWriter:
+    """Writes one finished query at a time and flushes, so a reader can tail the file."""
+
+    def __init__(self, stream: TextIO, fmt: str, write_header: bool):
+        self.stream = stream
+        self.fmt = fmt
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(stream, fieldnames=QUERY_FIELDS + ROW_FIELDS, extrasaction="ignore")
+            if write_header:
+                self._csv.writeheader()
+
+    def write(self, key: SearchKey, results: List[Dict[str, Any]]):
+        query = dict(zip(QUERY_FIELDS, key))
+        if self._csv is not None:
+            self._csv.writerows({**row, **query} for row in results)
+        else:
+            self.stream.write(json.dumps({**query, "count": len(results), "results": results}, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+# ---------------- Runner ----------------
+def run_bulk(queries: Iterator[SearchKey], writer: ResultWriter, checkpoint: Optional[str] = None,
+             concurrency: int = 4, fresh: bool = True, progress_every: int = 100) -> Dict[str, int]:
+    """
+    Runs queries with at most `concurrency` in flight (input is consumed lazily,
+    so a 10k-row file never becomes 10k pending futures). Failed queries are not
+    checkpointed and run again on the next invocation.
+    """
+    done = load_checkpoint(checkpoint)
+    stats = {"queued": 0, "skipped": 0, "done": 0, "failed": 0, "rows": 0}
+    search = scrape_and_store if fresh else (lambda k: search_trains(*k))
+    ckpt = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    started = time.time()
+    seen = set()
+
+    def finish(future, key):
+        try:
+            results = future.result() or []
+        except Exception as e:
+            stats["failed"] += 1
+            logger.error("Query fail %s: %s", key_id(key), e)
+            return
+        writer.write(key, results)
+        if ckpt:
+            ckpt.write(key_id(key) + "\n")
+            ckpt.flush()
+        stats["done"] += 1
+        stats["rows"] += len(results)
+        if stats["done"] % progress_every == 0:
+            logger.info("%s queries done (%.1f/s), %s failed", stats["done"],
+                        stats["done"] / max(time.time() - started, 1e-9), stats["failed"])
+
+    pending: Dict[Any, SearchKey] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk") as pool:
+            for key in queries:
+                kid = key_id(key)
+                if kid in done or kid in seen:
+                    stats["skipped"] += 1
+                    continue
+                seen.add(kid)
+                stats["queued"] += 1
+                pending[pool.submit(search, key)] = key
+                while len(pending) >= concurrency:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in finished:
+                        finish(f, pending.pop(f))
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    finish(f, pending.pop(f))
+    finally:
+        if ckpt:
+            ckpt.close()
+    stats["seconds"] = round(time.time() - started, 1)
+    return stats
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py bulk", description="Routes/dates file se bulk train search")
+    parser.add_argument("input", help="CSV or JSONL file (- for stdin CSV)")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="default: from the output extension, else jsonl")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--checkpoint", help="resume file (default: <output>.checkpoint when writing to a file)")
+    parser.add_argument("--cached", action="store_true",
+                        help="allow result cache / offline snapshot answers instead of always scraping")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    checkpoint = args.checkpoint or (f"{args.output}.checkpoint" if args.output != "-" else None)
+
+    if args.output == "-":
+        out = sys.stdout
+        write_header = True
+    else:
+        # continue the same file only when there is a checkpoint saying what it already holds
+        resuming = bool(load_checkpoint(checkpoint)) and os.path.exists(args.output) and os.path.getsize(args.output) > 0
+        out = open(args.output, "a" if resuming else "w", encoding="utf-8", newline="")
+        write_header = not resuming
+    try:
+        stats = run_bulk(read_queries(args.input), ResultWriter(out, fmt, write_header), checkpoint,
+                         max(1, args.concurrency), fresh=not args.cached)
+    except KeyboardInterrupt:
+        logger.warning("Bulk run interrupt: same command dobara chalayein, checkpoint se resume hoga")
+        return 130
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    logger.info("Bulk search khatam: %s", stats)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+# modules/extraction.py
+# LLM slot extraction: one static prompt prefix (identical bytes on every call, so
+# provider-side prompt caching applies), JSON-only output with a small token cap,
+# and streaming that stops as soon as one complete JSON object has arrived.
+#
+# ExtractionBatcher collects concurrent extractions from all sessions for a few
+# tens of ms and sends them as one prompt; each caller gets its own answer back.
+
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.settings import Config
+from modules.utils import Logger
+
+try:
+    from langchain_core.messages import HumanMessage, SystemMessage
+except Exception:  # langchain optional; plain prompt string is used instead
+    HumanMessage = SystemMessage = None
+
+logger = Logger("Extraction")
+
+SLOT_KEYS = ("from_station", "to_station", "travel_date", "budget", "preferred_time", "format_pref")
+
+# Static on purpose: nothing per-call (date, user text) goes in here
+_SLOT_SPEC = (
+    "from_station, to_station (city), "
+    "travel_date (YYYY-MM-DD; aaj=today, kal=+1, parso=+2, never past), "
+    'budget ("Economy Class"|"Business Class"|"AC Class"|"Rs. <amount>"), '
+    'preferred_time ("subah"|"dopahar"|"raat"; sham/evening/night=raat), '
+    'format_pref ("list"|"table"|"json"). '
+    "Use null for anything not stated."
+)
+EXTRACT_SYSTEM_PROMPT = (
+    "Extract Pakistan Railway booking details from the user's message (Roman Urdu or English). "
+    "Reply with ONE JSON object and nothing else, keys: " + _SLOT_SPEC
+)
+BATCH_SYSTEM_PROMPT = (
+    "Extract Pakistan Railway booking details from each numbered user message (Roman Urdu or English); "
+    "messages are unrelated. Reply with ONE JSON object and nothing else: "
+    '{"results": [...]} with exactly one object per message, in the same order, keys: ' + _SLOT_SPEC
+)
+
+
+def _to_messages(system: str, user: str):
+    if SystemMessage is None:
+        return f"{system}\n\n{user}"
+    return [SystemMessage(content=system), HumanMessage(content=user)]
+
+
+def build_messages(user_input: str, today: str):
+    return _to_messages(EXTRACT_SYSTEM_PROMPT, f"today={today}\n{user_input}")
+
+
+def build_batch_messages(user_inputs: List[str], today: str):
+    lines = [f"{i}. {' '.join(str(t).split())}" for i, t in enumerate(user_inputs, 1)]
+    return _to_messages(BATCH_SYSTEM_PROMPT, f"today={today}\n" + "\n".join(lines))
+
+
+class JsonObjectScanner:
+    """
+    Incremental scanner for the first complete top-level {...} in a text stream.
+    Tracks string/escape state so braces inside values don't count.
+    """
+
+    __slots__ = ("_buf", "_start", "_depth", "_in_str", "_esc", "_pos")
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._start = -1
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._pos = 0
+
+    def feed(self, text: str) -> Optional[str]:
+        """Returns the object's source once it is complete, else None."""
+        self._buf.append(text)
+        for ch in text:
+            i = self._pos
+            self._pos += 1
+            if self._start < 0:
+                if ch == "{":
+                    self._start, self._depth = i, 1
+                continue
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return "".join(self._buf)[self._start:i + 1]
+        return None
+
+
+def first_json_object(chunks: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """Consume chunks only until the first complete object parses; the rest is never read."""
+    scanner = JsonObjectScanner()
+    for chunk in chunks:
+        obj = scanner.feed(chunk)
+        if obj is not None:
+            try:
+                data = json.loads(obj)
+            except ValueError:
+                return None
+            return data if isinstance(data, dict) else None
+    return None
+
+
+def _bound(llm, json_mode: bool, max_tokens: int = Config.LLM_EXTRACT_MAX_TOKENS):
+    kwargs = {"max_tokens": max_tokens}
+    if json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
+    try:
+        return llm.bind(**kwargs)
+    except Exception:
+        return llm  # client without bind(): uncapped but still works
+
+
+def extract_slots(llm, user_input: str, today: str,
+                  stream: bool = Config.LLM_STREAM, json_mode: bool = Config.LLM_JSON_MODE) -> Optional[Dict[str, Any]]:
+    """One extraction call. None when the model did not return a JSON object."""
+    data = _complete(_bound(llm, json_mode), build_messages(user_input, today), stream)
+    if data is None:
+        return None
+    return {k: data.get(k) for k in SLOT_KEYS}
+
+
+def extract_batch(llm, user_inputs: List[str], today: str,
+                  stream: bool = Config.LLM_STREAM, json_mode: bool = Config.LLM_JSON_MODE) -> Optional[List[Dict[str, Any]]]:
+    """One call for several messages. None unless the reply has exactly one object per message."""
+    client = _bound(llm, json_mode, Config.LLM_EXTRACT_MAX_TOKENS * len(user_inputs) + 16)
+    data = _complete(client, build_batch_messages(user_inputs, today), stream)
+    results = (data or {}).get("results")
+    if not isinstance(results, list) or len(results) != len(user_inputs) or not all(isinstance(r, dict) for r in results):
+        return None
+    return [{k: r.get(k) for k in SLOT_KEYS} for r in results]
+
+
+def _complete(client, messages, stream: bool) -> Optional[Dict[str, Any]]:
+    if stream and hasattr(client, "stream"):
+        gen = client.stream(messages)
+        try:
+            data = first_json_object(getattr(c, "content", None) or "" for c in gen)
+        finally:
+            close = getattr(gen, "close", None)
+            if close:
+                close()  # drops the HTTP stream instead of reading the tail
+    else:
+        resp = client.invoke(messages)
+        data = first_json_object([getattr(resp, "content", None) or str(resp)])
+    return data
+
+
+# ---------------- Micro-batching ----------------
+class _Pending:
+    __slots__ = ("text", "today", "future")
+
+    def __init__(self, text: str, today: str):
+        self.text = text
+        self.today = today
+        self.future: Future = Future()
+
+
+class ExtractionBatcher:
+    """
+    Callers block on extract(); a collector thread groups requests that arrive
+    within `window_ms` (up to `max_batch`) into one LLM call. A lone request with
+    no LLM call in flight goes out at once: when the process is that idle nothing
+    is likely to arrive to share the call with. A batch that fails (API error, or
+    a reply that can't be mapped back 1:1) is retried as single calls, so a caller
+    only sees an error from its own call (and then goes offline as before).
+    """
+
+    def __init__(self, llm, window_ms: float = Config.LLM_BATCH_WINDOW_MS, max_batch: int = Config.LLM_BATCH_MAX):
+        self.llm = llm
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=Config.LLM_BATCH_WORKERS, thread_name_prefix="llm-batch")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.stats = {"requests": 0, "calls": 0, "batches": 0, "batched_items": 0, "fallbacks": 0, "immediate": 0}
+        self._thread = threading.Thread(target=self._collect, name="llm-batcher", daemon=True)
+        self._thread.start()
+
+    def extract(self, user_input: str, today: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        item = _Pending(user_input, today)
+        with self._lock:
+            self.stats["requests"] += 1
+        self._queue.put(item)
+        return item.future.result(timeout=timeout)
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            with self._lock:
+                if self._in_flight == 0 and self._queue.empty():
+                    deadline = 0.0  # nothing to wait for
+                    self.stats["immediate"] += 1
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # group by date so one prompt has a single "today"
+            by_day: Dict[str, List[_Pending]] = {}
+            for item in batch:
+                by_day.setdefault(item.today, []).append(item)
+            for items in by_day.values():
+                self._submit(self._run, items)
+
+    def _submit(self, fn, arg):
+        with self._lock:
+            self._in_flight += 1
+
+        def task():
+            try:
+                fn(arg)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        self._pool.submit(task)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self.stats[k] += v
+
+    def _single(self, item: _Pending):
+        self._count(calls=1)
+        try:
+            item.future.set_result(extract_slots(self.llm, item.text, item.today))
+        except Exception as e:
+            item.future.set_exception(e)
+
+    def _run(self, items: List[_Pending]):
+        if len(items) == 1:
+            return self._single(items[0])
+        self._count(calls=1, batches=1, batched_items=len(items))
+        try:
+            answers = extract_batch(self.llm, [i.text for i in items], items[0].today)
+        except Exception as e:
+            # one provider error must not push every session in the window offline;
+            # each message gets its own call and only its own error
+            logger.warning("Batched extraction fail (%s items), single calls try kar rahe hain: %s", len(items), e)
+            answers = None
+        if answers is None:
+            self._count(fallbacks=1)
+            for item in items:
+                self._submit(self._single, item)
+            return
+        for item, answer in zip(items, answers):
+            item.future.set_result(answer)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+
+_batchers: Dict[int, ExtractionBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(llm) -> ExtractionBatcher:
+    """One batcher per LLM client (the process shares a single client)."""
+    with _batchers_lock:
+        batcher = _batchers.get(id(llm))
+        if batcher is None or batcher.llm is not llm:
+            batcher = _batchers[id(llm)] = ExtractionBatcher(llm)
+        return batcher
+
+
+def batch_stats() -> Dict[str, Dict[str, int]]:
+    with _batchers_lock:
+        items = list(_batchers.values())
+    return {type(b.llm).__name__: b.snapshot() for b in items}
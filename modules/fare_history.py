@@ -0,0 +1,353 @@
+# modules/fare_history.py
+# Append-only columnar fare history + vectorized analytics (numpy memmap).
+#
+#   <dir>/observed_at.col   int64    epoch seconds when the fare was seen
+#   <dir>/travel_day.col    int32    travel date, days since 1970-01-01
+#   <dir>/route.col         uint32   id into routes.json ("Karachi → Lahore")
+#   <dir>/train.col         uint32   id into trains.json (train name)
+#   <dir>/cls.col           uint8    0 economy, 1 business, 2 ac
+#   <dir>/fare.col          float32  rupees
+#
+# Every scraped result set is appended as one row per (train, class). Readers
+# memory-map the columns, so queries scan millions of rows without loading them
+# into Python objects, and several workers can share the same files.
+#
+#   python -m modules.fare_history bench 5000000   # synthetic rows + query timings
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config.settings import Config
+from modules.utils import Logger
+
+try:
+    import fcntl  # cross-process append lock (not available on Windows)
+except ImportError:
+    fcntl = None
+
+logger = Logger("FareHistory")
+
+COLUMNS = (
+    ("observed_at", np.int64),
+    ("travel_day", np.int32),
+    ("route", np.uint32),
+    ("train", np.uint32),
+    ("cls", np.uint8),
+    ("fare", np.float32),
+)
+CLASSES = ("economy", "business", "ac")
+CLASS_FIELDS = ("economy_fare", "business_fare", "ac_fare")
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+PERCENTILES = (10, 25, 50, 75, 90)
+_EPOCH = date(1970, 1, 1)
+_FARE_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_fare(value) -> Optional[float]:
+    """'Rs. 1,600' -> 1600.0"""
+    m = _FARE_RE.search(str(value or ""))
+    return float(m.group(0).replace(",", "")) if m else None
+
+
+def route_name(from_station: str, to_station: str) -> str:
+    return f"{str(from_station).strip().title()} → {str(to_station).strip().title()}"
+
+
+def _day_number(value: str) -> int:
+    return (datetime.strptime(value, "%Y-%m-%d").date() - _EPOCH).days
+
+
+class FareHistory:
+    def __init__(self, directory: str = Config.FARE_HISTORY_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._names: Dict[str, Dict[str, int]] = {"routes": {}, "trains": {}}
+        self._names_mtime: Dict[str, float] = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # ---------------- Dictionaries (route/train names) ----------------
+    def _load_names(self, kind: str) -> Dict[str, int]:
+        path = self._path(f"{kind}.json")
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return self._names[kind]
+        if self._names_mtime.get(kind) != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                self._names[kind] = json.load(f)
+            self._names_mtime[kind] = mtime
+        return self._names[kind]
+
+    def _ids(self, kind: str, names: List[str]) -> List[int]:
+        """Caller holds the append lock; new names are persisted atomically."""
+        mapping = self._load_names(kind)
+        missing = [n for n in dict.fromkeys(names) if n not in mapping]
+        if missing:
+            for n in missing:
+                mapping[n] = len(mapping)
+            path = self._path(f"{kind}.json")
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(mapping, f, ensure_ascii=False)
+            os.replace(f"{path}.tmp", path)
+            self._names_mtime[kind] = os.path.getmtime(path)
+        return [mapping[n] for n in names]
+
+    @contextmanager
+    def _append_lock(self):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(".lock"), "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _row_counts(self) -> Dict[str, int]:
+        sizes = {}
+        for name, dtype in COLUMNS:
+            try:
+                sizes[name] = os.path.getsize(self._path(f"{name}.col")) // np.dtype(dtype).itemsize
+            except OSError:
+                sizes[name] = 0
+        return sizes
+
+    def _trim_torn_append(self):
+        """Cuts every column back to the shortest one (caller holds the append lock).
+        Without this, rows written after a partial append would pair up with the
+        wrong values in the columns that got ahead."""
+        sizes = self._row_counts()
+        n = min(sizes.values())
+        for name, dtype in COLUMNS:
+            path = self._path(f"{name}.col")
+            if os.path.exists(path) and os.path.getsize(path) != n * np.dtype(dtype).itemsize:
+                logger.warning("Fare history: %s.col %d se %d rows par trim", name, sizes[name], n)
+                os.truncate(path, n * np.dtype(dtype).itemsize)
+
+    # ---------------- Write ----------------
+    def append(self, observed_at, travel_day, routes: List[str], trains: List[str], cls, fare) -> int:
+        n = len(routes)
+        if not n:
+            return 0
+        with self._append_lock():
+            self._trim_torn_append()
+            values = {
+                "observed_at": observed_at,
+                "travel_day": travel_day,
+                "route": self._ids("routes", routes),
+                "train": self._ids("trains", trains),
+                "cls": cls,
+                "fare": fare,
+            }
+            for name, dtype in COLUMNS:
+                arr = np.asarray(values[name], dtype=dtype)
+                if arr.shape != (n,):
+                    arr = np.broadcast_to(arr, (n,))
+                with open(self._path(f"{name}.col"), "ab") as f:
+                    f.write(np.ascontiguousarray(arr).tobytes())
+        return n
+
+    def record_results(self, from_station, to_station, travel_date, results: List[Dict[str, Any]],
+                       observed_at: Optional[float] = None) -> int:
+        """One row per (train, class) with a parseable fare."""
+        try:
+            day = _day_number(travel_date)
+        except (TypeError, ValueError):
+            return 0
+        route = route_name(from_station, to_station)
+        trains, classes, fares = [], [], []
+        for r in results or []:
+            for c, field in enumerate(CLASS_FIELDS):
+                fare = parse_fare(r.get(field))
+                if fare is not None:
+                    trains.append(str(r.get("name") or "Unknown"))
+                    classes.append(c)
+                    fares.append(fare)
+        return self.append(int(observed_at or time.time()), day, [route] * len(trains), trains, classes, fares)
+
+    # ---------------- Read ----------------
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Memory-mapped columns, trimmed to the rows every column has (a torn append is ignored)."""
+        n = min(self._row_counts().values())
+        if n == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        return {
+            name: np.memmap(self._path(f"{name}.col"), dtype=dtype, mode="r", shape=(n,))
+            for name, dtype in COLUMNS
+        }
+
+    def __len__(self):
+        return len(self.columns()["fare"])
+
+    def _mask(self, cols, route: Optional[str], train: Optional[str], travel_class: Optional[str],
+              since: Optional[float]) -> Optional[np.ndarray]:
+        mask = np.ones(len(cols["fare"]), dtype=bool)
+        if route is not None:
+            rid = self._load_names("routes").get(route)
+            if rid is None:
+                return None
+            mask &= cols["route"] == rid
+        if train is not None:
+            tid = self._load_names("trains").get(train)
+            if tid is None:
+                return None
+            mask &= cols["train"] == tid
+        if travel_class is not None:
+            mask &= cols["cls"] == CLASSES.index(travel_class)
+        if since is not None:
+            mask &= cols["observed_at"] >= int(since)
+        return mask
+
+    @staticmethod
+    def _group_min_median(keys: np.ndarray, fares: np.ndarray):
+        """
+        Per-key count/min/median. Keys are shifted into uint16 so the stable argsort
+        is numpy's O(n) radix sort; the Python loop is per group (7 weekdays / N days),
+        never per row.
+        """
+        base = int(keys.min())
+        span = int(keys.max()) - base
+        small = (keys - base).astype(np.uint16 if span < 65536 else np.int64)
+        order = np.argsort(small, kind="stable")
+        f = fares[order]
+        count = np.bincount(small, minlength=span + 1)
+        uniq = np.flatnonzero(count)
+        ends = np.cumsum(count)[uniq]
+        count = count[uniq]
+        mins = np.empty(uniq.size)
+        medians = np.empty(uniq.size)
+        for i, (end, c) in enumerate(zip(ends, count)):
+            part = f[end - c:end]
+            mins[i] = part.min()
+            medians[i] = np.median(part)
+        return uniq + base, count, mins, medians
+
+    def stats(self, from_station=None, to_station=None, train: Optional[str] = None,
+              travel_class: Optional[str] = None, since: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Summary + day-of-week (of travel date) + daily trend for the selected rows.
+        Any filter left as None is not applied.
+        """
+        route = route_name(from_station, to_station) if from_station and to_station else None
+        cols = self.columns()
+        mask = self._mask(cols, route, train, travel_class, since)
+        out: Dict[str, Any] = {"route": route, "train": train, "class": travel_class, "count": 0}
+        if mask is None or not mask.any():
+            return out
+
+        fares = np.asarray(cols["fare"][mask])
+        pct = np.percentile(fares, PERCENTILES)
+        out.update({
+            "count": int(fares.size),
+            "min": float(fares.min()),
+            "max": float(fares.max()),
+            "mean": round(float(fares.mean(dtype=np.float64)), 2),
+            "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, pct)},
+        })
+
+        # cheapest day of the week to travel
+        weekday = (np.asarray(cols["travel_day"][mask], dtype=np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        wd, count, wmin, wmed = self._group_min_median(weekday, fares)
+        out["by_weekday"] = [
+            {"weekday": WEEKDAYS[d], "count": int(c), "min": round(float(m), 2), "median": round(float(md), 2)}
+            for d, c, m, md in zip(wd, count, wmin, wmed)
+        ]
+        out["cheapest_weekday"] = WEEKDAYS[int(wd[np.argmin(wmed)])]
+
+        # trend: daily median of observed fares, slope in Rs/day
+        day = np.asarray(cols["observed_at"][mask], dtype=np.int64) // 86400
+        days, count, dmin, dmed = self._group_min_median(day, fares)
+        slope = float(np.polyfit(days.astype(np.float64), dmed, 1)[0]) if days.size >= 2 else 0.0
+        out["trend"] = {
+            "days": int(days.size),
+            "slope_per_day": round(slope, 3),
+            "daily": [
+                {"date": str(date.fromordinal(_EPOCH.toordinal() + int(d))), "median": round(float(m), 2)}
+                for d, m in zip(days[-30:], dmed[-30:])
+            ],
+        }
+        return out
+
+
+_history: Optional[FareHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_fare_history() -> FareHistory:
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = FareHistory()
+        return _history
+
+
+def record_search(key, results) -> int:
+    """Hook for freshly scraped results; never lets a history failure break a search."""
+    if not Config.FARE_HISTORY_ENABLED or not results:
+        return 0
+    try:
+        return get_fare_history().record_results(key[0], key[1], key[2], results)
+    except Exception as e:
+        logger.warning("Fare history append fail: %s", e)
+        return 0
+
+
+# ---------------- Benchmark ----------------
+def _bench(rows: int, directory: str):
+    import shutil
+    shutil.rmtree(directory, ignore_errors=True)
+    hist = FareHistory(directory)
+    rng = np.random.default_rng(7)
+    routes = [route_name(a, b) for a in Config.SNAPSHOT_STATIONS for b in Config.SNAPSHOT_STATIONS if a != b]
+    trains = [f"Express {i}" for i in range(40)]
+    started = time.time()
+    chunk = 1_000_000
+    now = int(time.time())
+    today = (date.today() - _EPOCH).days
+    for offset in range(0, rows, chunk):
+        n = min(chunk, rows - offset)
+        route_idx = rng.integers(0, len(routes), n)
+        cls = rng.integers(0, 3, n)
+        travel_day = today + rng.integers(0, 60, n)
+        fare = 900 + cls * 700 + ((travel_day + 3) % 7 >= 4) * 150 + rng.normal(0, 80, n)
+        hist.append(now - rng.integers(0, 90 * 86400, n), travel_day,
+                    [routes[i] for i in route_idx], [trains[i] for i in rng.integers(0, 40, n)], cls, fare)
+    print(f"Wrote {len(hist):,} rows in {time.time() - started:.1f}s -> {directory}")
+    for label, kwargs in (
+        ("all rows", {}),
+        ("route + class", {"from_station": "Karachi", "to_station": "Lahore", "travel_class": "economy"}),
+    ):
+        started = time.perf_counter()
+        res = hist.stats(**kwargs)
+        print(f"{label:<14} {res['count']:>10,} rows  {(time.perf_counter() - started) * 1000:7.1f} ms  "
+              f"median={res['percentiles']['p50']}  cheapest={res['cheapest_weekday']}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "bench":
+        rows = int(argv[1]) if len(argv) > 1 else 1_000_000
+        _bench(rows, argv[2] if len(argv) > 2 else "data/fare_history_bench")
+        return
+    if len(argv) >= 2:
+        print(json.dumps(get_fare_history().stats(argv[0], argv[1], travel_class=argv[2] if len(argv) > 2 else None),
+                         ensure_ascii=False, indent=2))
+        return
+    print("Usage: python -m modules.fare_history FROM TO [economy|business|ac]  |  bench [ROWS] [DIR]")
+
+
+if __name__ == "__main__":
+    main()
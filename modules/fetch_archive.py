@@ -0,0 +1,109 @@
+# modules/fetch_archive.py
+# On-disk archive of fetched pages for record/replay scraping.
+#
+#   <dir>/index.jsonl        one JSON line per recorded fetch (url, status, elapsed, tier, body file)
+#   <dir>/bodies/<sha>.gz    gzip-compressed page body (deduplicated by content hash)
+#
+# Replay serves the recorded body back with the original (or scaled) latency,
+# with no browser or network involved.
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+class ArchiveMiss(LookupError):
+    """Replay mode asked for a URL that was never recorded."""
+
+
+class FetchArchive:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self.bodies_dir = os.path.join(directory, "bodies")
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.isfile(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # tolerate a torn last line from an interrupted recording
+                self._entries[entry["url"]].append(entry)
+
+    def __len__(self):
+        return sum(len(v) for v in self._entries.values())
+
+    # ---------------- Record ----------------
+    def record(self, url: str, body: str, elapsed: float, status: int = 200, tier: str = "selenium"):
+        data = (body or "").encode("utf-8")
+        digest = hashlib.sha1(data).hexdigest()
+        entry = {
+            "url": url,
+            "status": status,
+            "elapsed": round(elapsed, 4),
+            "tier": tier,
+            "body": digest,
+            "size": len(data),
+            "recorded_at": time.time(),
+        }
+        with self._lock:
+            os.makedirs(self.bodies_dir, exist_ok=True)
+            body_path = os.path.join(self.bodies_dir, f"{digest}.gz")
+            if not os.path.exists(body_path):
+                with gzip.open(body_path, "wb") as f:
+                    f.write(data)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._entries[url].append(entry)
+
+    # ---------------- Replay ----------------
+    def replay(self, url: str, latency_scale: float = 1.0) -> Tuple[str, int, float]:
+        """
+        Returns (body, status, original_elapsed). Repeated fetches of the same URL
+        walk through its recordings in order and wrap around.
+        """
+        with self._lock:
+            entries = self._entries.get(url)
+            if not entries:
+                raise ArchiveMiss(url)
+            i = self._cursor[url] % len(entries)
+            self._cursor[url] += 1
+            entry = entries[i]
+
+        with gzip.open(os.path.join(self.bodies_dir, f"{entry['body']}.gz"), "rb") as f:
+            body = f.read().decode("utf-8")
+        if latency_scale > 0:
+            time.sleep(entry["elapsed"] * latency_scale)
+        return body, entry["status"], entry["elapsed"]
+
+    def urls(self) -> List[str]:
+        return list(self._entries.keys())
+
+
+_archives: Dict[str, FetchArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(directory: str) -> FetchArchive:
+    """One archive object per directory per process (shared replay cursors + write lock)."""
+    with _archives_lock:
+        archive = _archives.get(directory)
+        if archive is None:
+            archive = _archives[directory] = FetchArchive(directory)
+        return archive
+
@@ -0,0 +1,236 @@
+# modules/http_cache.py
+# On-disk HTTP cache for the scraper's requests tier.
+#
+# - Honours Cache-Control (max-age, no-cache, no-store), Expires and Age
+# - Stale entries are revalidated with If-None-Match / If-Modified-Since; a 304
+#   refreshes the stored entry and the cached body is returned
+# - One file per URL: small JSON header + zlib body, written atomically, so all
+#   scraper instances and worker processes can share the directory
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from config.settings import Config
+
+# Body is stored decoded, so transfer-level headers must not be replayed
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+_LEN = struct.Struct("<I")
+
+
+def _http_date(value) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _cache_control(headers) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, value = part.partition("=")
+        directives[name.strip()] = value.strip().strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers, now: float) -> float:
+    """Seconds the response may be served without revalidation (RFC 9111, private cache)."""
+    cc = _cache_control(headers)
+    if "no-cache" in cc:
+        return 0.0
+    if cc.get("max-age") is not None:
+        try:
+            return max(0.0, float(cc["max-age"]))
+        except ValueError:
+            return 0.0
+    expires = _http_date(headers.get("Expires"))
+    if expires is not None:
+        date = _http_date(headers.get("Date")) or now
+        return max(0.0, expires - date)
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        # heuristic freshness: 10% of the time since last modification
+        date = _http_date(headers.get("Date")) or now
+        return min(Config.HTTP_CACHE_HEURISTIC_MAX, max(0.0, (date - last_modified) * 0.1))
+    return 0.0
+
+
+class DiskCache:
+    def __init__(self, directory: str = Config.HTTP_CACHE_DIR, max_bytes: int = Config.HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.bin")
+
+    @staticmethod
+    def key(method: str, url: str) -> str:
+        return hashlib.sha256(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "rb") as f:
+                raw = f.read()
+            (meta_len,) = _LEN.unpack_from(raw, 0)
+            meta = json.loads(raw[_LEN.size:_LEN.size + meta_len])
+            meta["body"] = zlib.decompress(raw[_LEN.size + meta_len:])
+            return meta
+        except (OSError, ValueError, zlib.error, struct.error):
+            return None
+
+    def put(self, key: str, meta: Dict[str, Any], body: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_LEN.pack(len(header)))
+            f.write(header)
+            f.write(zlib.compress(body, 6))
+        os.replace(tmp, path)
+        with self._lock:
+            self.stored += 1
+            self._writes += 1
+            prune = self._writes % 200 == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Drop least recently written files until under max_bytes."""
+        files = []
+        for root, _dirs, names in os.walk(self.directory):
+            for n in names:
+                if n.endswith(".bin"):
+                    p = os.path.join(root, n)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        for _mtime, size, p in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(p)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses, "stored": self.stored}
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter: mount on a requests.Session for http:// and https://."""
+
+    def __init__(self, cache: DiskCache, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    def _build(self, request, meta: Dict[str, Any], cache_state: str) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = meta["status"]
+        resp.reason = "OK"
+        resp.headers = CaseInsensitiveDict(meta["headers"])
+        resp.headers["X-Cache"] = cache_state
+        resp._content = meta["body"]
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = meta["url"]
+        resp.request = request
+        resp.connection = self
+        return resp
+
+    def _store(self, key: str, url: str, status: int, resp: requests.Response, body: bytes, now: float):
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+        age = str(resp.headers.get("Age") or "0").strip()
+        age = float(age) if age.isdigit() else 0.0  # time already spent in upstream caches
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": headers,
+            "stored_at": now,
+            "fresh_until": now + freshness_lifetime(resp.headers, now) - age,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+        self.cache.put(key, meta, body)
+        meta["body"] = body
+        return meta
+
+    def send(self, request, **kwargs):
+        if request.method != "GET" or "no-cache" in (request.headers.get("Cache-Control") or "").lower():
+            return super().send(request, **kwargs)
+
+        key = DiskCache.key(request.method, request.url)
+        entry = self.cache.get(key)
+        now = time.time()
+        if entry and entry["fresh_until"] > now:
+            self.cache.hits += 1
+            return self._build(request, entry, "HIT")
+
+        if entry:
+            if entry.get("etag"):
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = super().send(request, **kwargs)
+        now = time.time()
+
+        if resp.status_code == 304 and entry:
+            # headers from the 304 update the stored ones (new Cache-Control/ETag/Date)
+            merged = CaseInsensitiveDict(entry["headers"])
+            merged.update({k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS})
+            resp.headers = merged
+            updated = self._store(key, entry["url"], entry["status"], resp, entry["body"], now)
+            self.cache.revalidated += 1
+            resp.close()
+            return self._build(request, updated, "REVALIDATED")
+
+        self.cache.misses += 1
+        if resp.status_code == 200 and "no-store" not in _cache_control(resp.headers):
+            body = resp.content  # reads + decodes the body once
+            if resp.headers.get("ETag") or resp.headers.get("Last-Modified") or freshness_lifetime(resp.headers, now) > 0:
+                self._store(key, request.url, resp.status_code, resp, body, now)
+        return resp
+
+
+_cache: Optional[DiskCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> DiskCache:
+    """Process-wide cache object (the directory itself is shared across processes)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache()
+        return _cache
+
+
+def install(session: requests.Session) -> requests.Session:
+    adapter = CachingAdapter(get_http_cache())
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
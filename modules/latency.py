@@ -0,0 +1,81 @@
+# modules/latency.py
+# Observed fetch latency per tier -> adaptive timeouts + hedge delay.
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from config.settings import Config
+
+
+class LatencyTracker:
+    """Rolling window of successful fetch durations for one tier (seconds)."""
+
+    def __init__(self, window: int = Config.LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.timeouts = 0
+        self._timeout_streak = 0  # consecutive timeouts since the last success
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._timeout_streak = 0
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+            self._timeout_streak += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < Config.LATENCY_MIN_SAMPLES:
+                return None  # not enough data yet, callers use static defaults
+            s = sorted(self._samples)
+        return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+    def timeout(self, default: float) -> float:
+        """
+        p99 * multiplier, clamped to [LATENCY_MIN_TIMEOUT, default]. Timeouts never
+        enter the window, so after an upstream slowdown every fetch could time out
+        and the p99 would never move again; each consecutive timeout doubles the
+        value instead, until a fetch succeeds (or it is back at default).
+        """
+        p99 = self.percentile(99)
+        if p99 is None:
+            return default
+        with self._lock:
+            backoff = 2 ** min(self._timeout_streak, 16)
+        return max(Config.LATENCY_MIN_TIMEOUT, min(default, p99 * Config.LATENCY_TIMEOUT_MULTIPLIER * backoff))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Fire the backup request once the primary runs past its p95."""
+        return self.percentile(95)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "samples": len(self._samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "timeouts": self.timeouts,
+            "timeout_streak": self._timeout_streak,
+        }
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def tracker(tier: str) -> LatencyTracker:
+    with _trackers_lock:
+        t = _trackers.get(tier)
+        if t is None:
+            t = _trackers[tier] = LatencyTracker()
+        return t
+
+
+def all_stats() -> Dict[str, Dict[str, Optional[float]]]:
+    with _trackers_lock:
+        items = list(_trackers.items())
+    return {tier: t.stats() for tier, t in items}
@@ -0,0 +1,232 @@
+# modules/prefetch.py
+# Result cache + popularity tracking + background prefetch for hot routes.
+# Hot (route, date) keys are refreshed before they expire so users never wait on a scrape.
+
+import copy
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import Config
+from modules.utils import Logger
+
+SearchKey = Tuple[str, str, str, str]  # (from_station, to_station, travel_date, preferred_time)
+
+
+class ResultCache:
+    """Thread-safe TTL + LRU cache: search key -> scraped result list."""
+
+    def __init__(self, ttl: int = Config.RESULT_CACHE_TTL, max_entries: int = Config.RESULT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[SearchKey, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: SearchKey) -> Optional[List[Dict[str, Any]]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            results = entry[1]
+        # callers get their own copy; mutating it must not change the cached entry
+        return copy.deepcopy(results)
+
+    def put(self, key: SearchKey, results: List[Dict[str, Any]], ttl: Optional[int] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def remaining_ttl(self, key: SearchKey) -> float:
+        """Seconds until expiry; 0 if missing or already expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry[0] - time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        return {"entries": size, "hits": self.hits, "misses": self.misses}
+
+
+class QueryTracker:
+    """Exponentially decayed query counts per search key (popularity)."""
+
+    def __init__(self, half_life: int = Config.PREFETCH_HALF_LIFE, max_keys: int = 5000):
+        self.decay = math.log(2) / max(1, half_life)
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._scores: Dict[SearchKey, Tuple[float, float]] = {}  # key -> (score, last_update)
+
+    def _decayed(self, score: float, last: float, now: float) -> float:
+        return score * math.exp(-self.decay * (now - last))
+
+    def record(self, key: SearchKey, weight: float = 1.0):
+        now = time.time()
+        with self._lock:
+            score, last = self._scores.get(key, (0.0, now))
+            self._scores[key] = (self._decayed(score, last, now) + weight, now)
+            if len(self._scores) > self.max_keys:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        # keep the hottest half; called with lock held
+        keep = heapq.nlargest(
+            self.max_keys // 2,
+            self._scores.items(),
+            key=lambda kv: self._decayed(kv[1][0], kv[1][1], now),
+        )
+        self._scores = dict(keep)
+
+    def top(self, n: int) -> List[Tuple[SearchKey, float]]:
+        now = time.time()
+        with self._lock:
+            scored = [(k, self._decayed(s, t, now)) for k, (s, t) in self._scores.items()]
+        return heapq.nlargest(n, scored, key=lambda kv: kv[1])
+
+
+class PrefetchScheduler:
+    """
+    Background thread that keeps the top-N keys warm.
+
+    - Har tick par top-N keys dekhta hai jo missing hain ya expiry ke qareeb hain
+    - Scrape budget per minute (token bucket) se zyada scrape nahi karta
+    - Upstream slow/failing ho to budget adha (backoff); theek hone par wapas barhata hai
+    """
+
+    MIN_BACKOFF = 1.0 / 8
+
+    def __init__(
+        self,
+        refresh_fn: Callable[[SearchKey], Optional[List[Dict[str, Any]]]],
+        cache: ResultCache,
+        tracker: QueryTracker,
+        top_n: int = Config.PREFETCH_TOP_N,
+        scrapes_per_minute: float = Config.PREFETCH_SCRAPES_PER_MINUTE,
+        refresh_margin: int = Config.PREFETCH_REFRESH_MARGIN,
+        slow_seconds: float = Config.PREFETCH_SLOW_SCRAPE_SECONDS,
+        tick: float = 5.0,
+    ):
+        self.logger = Logger("PrefetchScheduler")
+        self.refresh_fn = refresh_fn
+        self.cache = cache
+        self.tracker = tracker
+        self.top_n = top_n
+        self.scrapes_per_minute = scrapes_per_minute
+        self.refresh_margin = refresh_margin
+        self.slow_seconds = slow_seconds
+        self.tick = tick
+
+        self.backoff = 1.0               # multiplier on the scrape budget
+        self._tokens = float(scrapes_per_minute)
+        self._last_refill = time.time()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.refreshed = 0
+        self.failed = 0
+        self.last_scrape_seconds: Optional[float] = None
+
+    # ---------------- Lifecycle ----------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prefetch-scheduler", daemon=True)
+        self._thread.start()
+        self.logger.info("Prefetch scheduler start ho gaya")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ---------------- Budget ----------------
+    def _refill(self):
+        now = time.time()
+        rate = self.scrapes_per_minute * self.backoff / 60.0
+        cap = max(1.0, self.scrapes_per_minute * self.backoff)
+        self._tokens = min(cap, self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+
+    def _take_token(self) -> bool:
+        self._refill()
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def _observe(self, seconds: float, ok: bool):
+        self.last_scrape_seconds = seconds
+        if not ok or seconds > self.slow_seconds:
+            self.backoff = max(self.MIN_BACKOFF, self.backoff / 2)
+            self.logger.warning("Upstream slow/fail (%.1fs), prefetch backoff=%.3f", seconds, self.backoff)
+        elif self.backoff < 1.0:
+            self.backoff = min(1.0, self.backoff * 2)
+
+    # ---------------- Work ----------------
+    def due_keys(self) -> List[SearchKey]:
+        """Hot keys that are missing or will expire within the refresh margin, hottest first."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        due = []
+        for key, _score in self.tracker.top(self.top_n):
+            if key[2] < today:
+                continue  # past travel date, nothing to keep warm
+            if self.cache.remaining_ttl(key) <= self.refresh_margin:
+                due.append(key)
+        return due
+
+    def run_once(self) -> int:
+        refreshed = 0
+        for key in self.due_keys():
+            if self._stop.is_set() or not self._take_token():
+                break
+            started = time.time()
+            ok = False
+            try:
+                ok = bool(self.refresh_fn(key))
+            except Exception as e:
+                self.logger.warning("Prefetch refresh fail %s: %s", key, e)
+            self._observe(time.time() - started, ok)
+            if ok:
+                refreshed += 1
+                self.refreshed += 1
+            else:
+                self.failed += 1
+        return refreshed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.error("Prefetch loop error: %s", e)
+            self._stop.wait(self.tick)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "backoff": self.backoff,
+            "tokens": round(self._tokens, 2),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "last_scrape_seconds": self.last_scrape_seconds,
+            "hot_keys": len(self.tracker.top(self.top_n)),
+        }
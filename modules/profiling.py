@@ -0,0 +1,218 @@
+# modules/profiling.py
+# Opt-in per-request profiling for the API.
+#
+# A request is profiled when it carries `X-Profile: <PROFILE_ADMIN_TOKEN>` or is
+# picked by PROFILE_SAMPLE_RATE. For that request only:
+#   - a sampler thread reads every thread's stack every PROFILE_INTERVAL_MS
+#     (sys._current_frames; nothing is hooked into the profiled code) and counts
+#     folded stacks rooted at the thread name, ready for flamegraph.pl / speedscope.
+#     The handler's work fans out to the hedge, speculative-search and LLM batch
+#     pools, so those threads are sampled too; threads with no app frame on their
+#     stack (idle pool workers, the event loop) are skipped
+#   - tracemalloc snapshots before/after give the top allocation deltas by line
+# The result is one JSON file in PROFILE_DIR, listed by GET /api/profiles.
+#
+# Disabled (no token, rate 0) the check is two attribute reads and the handler
+# runs under a nullcontext: no thread, no tracemalloc.
+
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config.settings import Config
+from modules.utils import Logger
+
+logger = Logger("Profiling")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(Config.PROFILE_ADMIN_TOKEN) or Config.PROFILE_SAMPLE_RATE > 0
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(Config.PROFILE_ADMIN_TOKEN and token) and hmac.compare_digest(
+        token.encode("utf-8"), Config.PROFILE_ADMIN_TOKEN.encode("utf-8"))
+
+
+def should_profile(token: Optional[str]) -> bool:
+    if token and is_admin(token):
+        return True
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+def maybe_profile(name: str, token: Optional[str] = None):
+    """`with maybe_profile("chat", x_profile):` around a handler body."""
+    if not enabled() or not should_profile(token):
+        return nullcontext()
+    return profile(name)
+
+
+# ---------------- CPU sampler ----------------
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    if path.startswith(_ROOT):
+        path = os.path.relpath(path, _ROOT)
+    else:
+        path = os.path.basename(path)
+    return f"{path}:{code.co_name}"
+
+
+def _thread_label(thread_id: int, handler_id: int, names: Dict[int, str]) -> str:
+    if thread_id == handler_id:
+        return "thread:handler"
+    # "hedge_3" / "spec-search_0" -> one root per pool
+    return "thread:" + re.sub(r"_\d+$", "", names.get(thread_id, str(thread_id)))
+
+
+class StackSampler(threading.Thread):
+    """Samples all threads' Python stacks at a fixed interval into folded-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id  # the handler thread
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._done = threading.Event()  # not _stop: that name is Thread's own
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._done.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                labels, in_app = [], False
+                while frame is not None:
+                    in_app = in_app or frame.f_code.co_filename.startswith(_ROOT)
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                if not in_app and thread_id != self.thread_id:
+                    continue
+                labels.append(_thread_label(thread_id, self.thread_id, names))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+# ---------------- tracemalloc ----------------
+def _tracemalloc_acquire():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(Config.PROFILE_TRACEMALLOC_FRAMES)
+        _tracemalloc_users += 1
+
+
+def _tracemalloc_release():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+def _alloc_top(before, after, limit: int) -> List[Dict[str, Any]]:
+    out = []
+    for stat in after.compare_to(before, "lineno")[:limit]:
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        path = os.path.relpath(frame.filename, _ROOT) if frame.filename.startswith(_ROOT) else frame.filename
+        out.append({"line": f"{path}:{frame.lineno}", "size_diff": stat.size_diff, "count_diff": stat.count_diff})
+    return out
+
+
+@contextmanager
+def profile(name: str):
+    """
+    Profiles the calling thread and the pool threads it hands work to. Stacks of
+    other threads and the allocation deltas (tracemalloc has no per-thread view)
+    are process-wide, so concurrent requests show up in them too.
+    """
+    _tracemalloc_acquire()
+    before = tracemalloc.take_snapshot()
+    sampler = StackSampler(threading.get_ident(), Config.PROFILE_INTERVAL_MS / 1000.0)
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    sampler.start()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - started
+        cpu = time.thread_time() - cpu_started
+        sampler.stop()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        _tracemalloc_release()
+        try:
+            _write(name, wall, cpu, sampler, _alloc_top(before, after, Config.PROFILE_TOP_ALLOCS), peak)
+        except Exception as e:
+            logger.warning("Profile save fail: %s", e)
+
+
+def _write(name, wall, cpu, sampler: StackSampler, allocs, peak):
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:6]}"
+    data = {
+        "id": profile_id,
+        "name": name,
+        "wall_ms": round(wall * 1000, 2),
+        "cpu_ms": round(cpu * 1000, 2),
+        "interval_ms": Config.PROFILE_INTERVAL_MS,
+        "samples": sampler.samples,
+        "folded": [f"{stack} {n}" for stack, n in sampler.stacks.most_common()],
+        "alloc_top": allocs,
+        "traced_peak_bytes": peak,
+    }
+    path = os.path.join(Config.PROFILE_DIR, f"{profile_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    logger.info("Profile saved: %s (%.0f ms, %s samples)", path, data["wall_ms"], sampler.samples)
+
+
+# ---------------- Listing ----------------
+def list_profiles(limit: int = 100) -> List[Dict[str, Any]]:
+    try:
+        names = [n for n in os.listdir(Config.PROFILE_DIR) if n.endswith(".json")]
+    except FileNotFoundError:
+        return []
+    out = []
+    for n in sorted(names, reverse=True)[:limit]:
+        path = os.path.join(Config.PROFILE_DIR, n)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        out.append({k: data.get(k) for k in ("id", "name", "wall_ms", "cpu_ms", "samples", "traced_peak_bytes")})
+    return out
+
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    if not profile_id or os.path.basename(profile_id) != profile_id:
+        return None
+    path = os.path.join(Config.PROFILE_DIR, f"{profile_id}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,184 @@
+# modules/rate_limit.py
+# Shared per-host limiter (token bucket + concurrency cap) and jittered retries.
+# All scraper fetches to one host go through the same limiter, across sessions/threads.
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from config.settings import Config
+
+
+class RetryableStatus(Exception):
+    """Upstream answered 429/503 (optionally with Retry-After seconds)."""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LimiterTimeout(Exception):
+    """Could not get a slot for the host within the wait budget."""
+
+
+# Transient failures worth another attempt; anything else (parse errors, bugs,
+# 4xx) fails straight away instead of hammering the host again
+RETRYABLE_ERRORS = (TimeoutError, ConnectionError, requests.Timeout, requests.ConnectionError)
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    def __init__(self, host: str, rate: float = Config.HOST_RATE_PER_SECOND,
+                 burst: int = Config.HOST_BURST, max_concurrency: int = Config.HOST_MAX_CONCURRENCY):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0       # set by Retry-After / 429 cooldown
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        # metrics
+        self.requests = 0
+        self.throttled = 0              # requests that had to wait for a token or cooldown
+        self.wait_seconds = 0.0
+        self.retries = 0
+        self.rate_limited = 0           # 429/503 responses seen
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _wait_for_token(self, deadline: float) -> float:
+        waited = 0.0
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if now >= self._blocked_until and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                pause = max(self._blocked_until - now, (1.0 - self._tokens) / self.rate)
+                if now + pause > deadline:
+                    raise LimiterTimeout(f"{self.host}: rate limit wait budget khatam")
+                self._cond.wait(pause)
+                waited += time.monotonic() - now
+
+    @contextmanager
+    def slot(self, max_wait: float = Config.HOST_MAX_WAIT):
+        deadline = time.monotonic() + max_wait
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=max_wait):
+            raise LimiterTimeout(f"{self.host}: concurrency cap par slot nahi mila")
+        try:
+            self._wait_for_token(deadline)
+            waited = time.monotonic() - started
+            with self._cond:
+                self.requests += 1
+                if waited > 0.001:
+                    self.throttled += 1
+                    self.wait_seconds += waited
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            yield
+        finally:
+            with self._cond:
+                self.in_flight = max(0, self.in_flight - 1)
+            self._slots.release()
+
+    def cooldown(self, seconds: float):
+        """Pause the whole host (all callers), e.g. after Retry-After."""
+        with self._cond:
+            self.rate_limited += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + min(seconds, Config.RETRY_AFTER_MAX))
+            self._cond.notify_all()
+
+    def note_retry(self):
+        with self._cond:
+            self.retries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "cooldown_remaining": round(max(0.0, self._blocked_until - time.monotonic()), 3),
+            }
+
+
+_limiters: Dict[str, HostLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(url: str) -> HostLimiter:
+    host = urlparse(url).netloc.lower() or url
+    with _limiters_lock:
+        lim = _limiters.get(host)
+        if lim is None:
+            lim = _limiters[host] = HostLimiter(host)
+        return lim
+
+
+def backoff_delay(attempt: int, base: float = Config.RETRY_BASE_DELAY, cap: float = Config.RETRY_MAX_DELAY) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def with_retries(fn: Callable[[], Any], url: str, retries: int = Config.MAX_RETRIES,
+                 retry_on: tuple = RETRYABLE_ERRORS, logger=None):
+    """
+    Call fn() up to 1 + retries times. RetryableStatus with Retry-After cools the
+    whole host down for that long; retry_on errors back off with jitter; anything
+    else is raised at once.
+    """
+    limiter = limiter_for(url)
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except LimiterTimeout:
+            raise  # waiting longer would only add queueing
+        except RetryableStatus as e:
+            # host-wide cooldown; the next slot() waits it out for every caller
+            limiter.cooldown(e.retry_after if e.retry_after is not None else backoff_delay(attempt))
+            if attempt == retries:
+                raise
+            delay = 0.0
+        except retry_on as e:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            if logger:
+                logger.warning("Fetch attempt %d fail (%s), %.2fs baad retry", attempt + 1, e, delay)
+        limiter.note_retry()
+        if delay:
+            time.sleep(delay)
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        items = list(_limiters.items())
+    return {host: lim.stats() for host, lim in items}
@@ -0,0 +1,133 @@
+# modules/resource_block.py
+# Network-level resource blocking for headless Chrome (DevTools Network.setBlockedURLs)
+# plus per-page transfer accounting from the ChromeDriver performance log.
+#
+# Blocked requests never hit the network, so their real size is unknown; the
+# "saved" figure is an estimate from typical sizes per resource type.
+
+import json
+import threading
+from typing import Dict, Iterable, List
+
+from selenium.common.exceptions import WebDriverException
+
+from config.settings import Config
+
+TYPE_EXTENSIONS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "stylesheet": ("css",),
+    "media": ("mp4", "webm", "mp3", "ogg", "wav"),
+}
+
+# Rough median transfer sizes per DevTools resource type (bytes)
+TYPICAL_BYTES = {
+    "Image": 20_000,
+    "Font": 30_000,
+    "Stylesheet": 15_000,
+    "Script": 25_000,
+    "Media": 200_000,
+}
+_DEFAULT_BYTES = 5_000
+
+
+def blocked_url_patterns(types: Iterable[str] = None, extra: Iterable[str] = None) -> List[str]:
+    types = Config.BLOCK_RESOURCE_TYPES if types is None else types
+    extra = Config.BLOCK_URL_PATTERNS if extra is None else extra
+    patterns = []
+    for t in types:
+        for ext in TYPE_EXTENSIONS.get(t, ()):
+            patterns += [f"*.{ext}", f"*.{ext}?*"]
+    return patterns + [p for p in extra if p]
+
+
+def configure_options(options):
+    """Chrome options side: real image switch-off pref + performance log for accounting."""
+    if "image" in Config.BLOCK_RESOURCE_TYPES:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def apply(driver) -> bool:
+    """Install the block list on the driver's current target (each tab needs its own call)."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns()})
+        return True
+    except WebDriverException:
+        return False
+
+
+class PageTraffic:
+    __slots__ = ("requests", "bytes", "blocked", "est_saved", "_types")
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = 0
+        self.est_saved = 0
+        self._types = {}
+
+    def feed(self, method: str, params: dict):
+        if method == "Network.requestWillBeSent":
+            self._types[params.get("requestId")] = params.get("type")
+        elif method == "Network.loadingFinished":
+            self.requests += 1
+            self.bytes += int(params.get("encodedDataLength") or 0)
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            self.blocked += 1
+            rtype = params.get("type") or self._types.get(params.get("requestId"))
+            self.est_saved += TYPICAL_BYTES.get(rtype, _DEFAULT_BYTES)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"requests": self.requests, "bytes": self.bytes, "blocked": self.blocked, "est_saved_bytes": self.est_saved}
+
+
+def route_log(entries, sink: Dict[str, PageTraffic]):
+    """Feed performance-log entries into per-target accumulators (keyed by ChromeDriver webview id)."""
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        inner = msg.get("message") or {}
+        method = inner.get("method", "")
+        if not method.startswith("Network."):
+            continue
+        sink.setdefault(msg.get("webview", ""), PageTraffic()).feed(method, inner.get("params") or {})
+
+
+def drain(driver) -> PageTraffic:
+    """All traffic logged by a single-tab driver since the last drain."""
+    sink: Dict[str, PageTraffic] = {}
+    try:
+        route_log(driver.get_log("performance"), sink)
+    except WebDriverException:
+        pass
+    total = PageTraffic()
+    for t in sink.values():
+        total.requests += t.requests
+        total.bytes += t.bytes
+        total.blocked += t.blocked
+        total.est_saved += t.est_saved
+    return total
+
+
+# ---------------- Aggregate metrics ----------------
+_STATS = {"pages": 0, "requests": 0, "bytes": 0, "blocked": 0, "est_saved_bytes": 0}
+_stats_lock = threading.Lock()
+
+
+def record_page(url: str, traffic: PageTraffic, logger=None):
+    with _stats_lock:
+        _STATS["pages"] += 1
+        for k, v in traffic.as_dict().items():
+            _STATS[k] += v
+    if logger:
+        logger.info("Page %s: %d requests, %.1f KB transfer, %d blocked (~%.1f KB bacha)",
+                    url, traffic.requests, traffic.bytes / 1024, traffic.blocked, traffic.est_saved / 1024)
+
+
+def stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_STATS)
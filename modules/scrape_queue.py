@@ -0,0 +1,501 @@
+# modules/scrape_queue.py
+# Scrape jobs outside the API process.
+#
+#   SCRAPE_QUEUE_BACKEND=inline  -> scrape in the calling process (default, as before)
+#   SCRAPE_QUEUE_BACKEND=memory  -> in-process queue + worker threads (local stand-in / tests)
+#   SCRAPE_QUEUE_BACKEND=sqlite  -> jobs table in SCRAPE_QUEUE_PATH, drained by worker processes:
+#
+#       python -m modules.scrape_queue worker -n 4
+#
+# The API submits a job and waits for its result; identical jobs that are still
+# queued/running share one row. Workers claim jobs under a lease: a job whose worker
+# hung past SCRAPE_JOB_TIMEOUT is handed to another worker (up to
+# SCRAPE_JOB_ATTEMPTS). Supervised workers leave lease expiry to the supervisor,
+# which kills the hung worker first and only then requeues its job; it also
+# restarts dead workers (requeueing their job right away rather than at lease
+# expiry) and recycles each worker after SCRAPE_WORKER_MAX_JOBS so Chromium leaks
+# stay bounded. Only the worker holding the current lease can complete or fail a
+# job, so a hung worker finishing late can't overwrite the retry's outcome.
+#
+# Any broker with the ScrapeBroker methods (e.g. Redis-backed for several nodes)
+# can be dropped in through create_broker().
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import Config
+from modules.utils import Logger
+
+logger = Logger("ScrapeQueue")
+
+
+class JobFailed(Exception):
+    pass
+
+
+class Job:
+    __slots__ = ("id", "kind", "payload", "attempts")
+
+    def __init__(self, job_id: str, kind: str, payload: Dict[str, Any], attempts: int):
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+
+
+def _dedup_key(kind: str, payload: Dict[str, Any]) -> str:
+    return kind + ":" + json.dumps(payload, sort_keys=True, ensure_ascii=False)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class ScrapeBroker:
+    def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def result(self, job_id: str, timeout: float = Config.SCRAPE_JOB_WAIT) -> Any:
+        """Blocks until done; raises JobFailed or TimeoutError."""
+        raise NotImplementedError
+
+    def claim(self, worker: str, timeout: float = 1.0) -> Optional[Job]:
+        raise NotImplementedError
+
+    def complete(self, job_id: str, result: Any, worker: str):
+        """No-op unless `worker` still holds the job's lease."""
+        raise NotImplementedError
+
+    def fail(self, job_id: str, error: str, retry: bool = True, worker: Optional[str] = None):
+        """worker=None (supervisor) fails the job whoever holds it."""
+        raise NotImplementedError
+
+    def expire_leases(self):
+        """Requeues (or fails, out of attempts) running jobs older than the lease."""
+        raise NotImplementedError
+
+    def running(self) -> List[Dict[str, Any]]:
+        """[{id, worker, claimed_at}] for the supervisor."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def call(self, kind: str, payload: Dict[str, Any], timeout: float = Config.SCRAPE_JOB_WAIT) -> Any:
+        return self.result(self.submit(kind, payload), timeout)
+
+
+class MemoryBroker(ScrapeBroker):
+    """Same semantics as SQLiteBroker inside one process; workers are threads."""
+
+    def __init__(self, lease: float = Config.SCRAPE_JOB_TIMEOUT, attempts: int = Config.SCRAPE_JOB_ATTEMPTS):
+        self.lease = lease
+        self.max_attempts = attempts
+        self._cond = threading.Condition()
+        self._queue: "deque[str]" = deque()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._active: Dict[str, str] = {}  # dedup key -> job id (queued/running)
+        self._finished: "OrderedDict[str, Future]" = OrderedDict()  # for waiters that look up late
+        self._stats = {"submitted": 0, "shared": 0, "done": 0, "failed": 0, "retried": 0}
+
+    KEEP_FINISHED = 1000
+
+    def _retire(self, job_id, job):
+        self._active.pop(job["dedup"], None)
+        self._finished[job_id] = job["future"]
+        while len(self._finished) > self.KEEP_FINISHED:
+            self._finished.popitem(last=False)
+
+    def submit(self, kind, payload):
+        dedup = _dedup_key(kind, payload)
+        with self._cond:
+            job_id = self._active.get(dedup)
+            if job_id is not None:
+                self._stats["shared"] += 1
+                return job_id
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"kind": kind, "payload": payload, "dedup": dedup, "status": "queued",
+                                  "worker": None, "claimed_at": None, "attempts": 0, "future": Future()}
+            self._active[dedup] = job_id
+            self._queue.append(job_id)
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        return job_id
+
+    def result(self, job_id, timeout=Config.SCRAPE_JOB_WAIT):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            future = job["future"] if job else self._finished.get(job_id)
+        if future is None:
+            raise JobFailed(f"unknown job {job_id}")
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"job {job_id} not finished in {timeout}s")
+
+    def _expire_leases(self, now):
+        for job_id, job in list(self._jobs.items()):
+            if job["status"] == "running" and now - job["claimed_at"] > self.lease:
+                self._finish_failed(job_id, "lease expired", retry=True, worker=None)
+
+    def expire_leases(self):
+        with self._cond:
+            self._expire_leases(time.time())
+
+    def claim(self, worker, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._expire_leases(time.time())
+                if self._queue:
+                    job_id = self._queue.popleft()
+                    job = self._jobs[job_id]
+                    job.update(status="running", worker=worker, claimed_at=time.time(), attempts=job["attempts"] + 1)
+                    return Job(job_id, job["kind"], job["payload"], job["attempts"])
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def complete(self, job_id, result, worker):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "running" or job["worker"] != worker:
+                return  # lease expired and someone else owns it now
+            del self._jobs[job_id]
+            self._retire(job_id, job)
+            self._stats["done"] += 1
+        job["future"].set_result(result)
+
+    def _finish_failed(self, job_id, error, retry, worker):
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != "running" or (worker is not None and job["worker"] != worker):
+            return
+        if retry and job["attempts"] < self.max_attempts:
+            job.update(status="queued", worker=None, claimed_at=None)
+            self._queue.append(job_id)
+            self._stats["retried"] += 1
+            self._cond.notify()
+            return
+        del self._jobs[job_id]
+        self._retire(job_id, job)
+        self._stats["failed"] += 1
+        job["future"].set_exception(JobFailed(error))
+
+    def fail(self, job_id, error, retry=True, worker=None):
+        with self._cond:
+            self._finish_failed(job_id, error, retry, worker)
+
+    def running(self):
+        with self._cond:
+            return [{"id": i, "worker": j["worker"], "claimed_at": j["claimed_at"]}
+                    for i, j in self._jobs.items() if j["status"] == "running"]
+
+    def stats(self):
+        with self._cond:
+            running = sum(1 for j in self._jobs.values() if j["status"] == "running")
+            return dict(self._stats, queued=len(self._queue), running=running)
+
+
+class SQLiteBroker(ScrapeBroker):
+    """Jobs table shared by the API workers and scrape workers on one host; one connection per thread."""
+
+    POLL_MIN, POLL_MAX = 0.02, 0.25
+    PURGE_EVERY = 200  # completions between cleanups of finished rows
+    KEEP_FINISHED = 600  # seconds a finished row stays readable for waiters
+
+    def __init__(self, path: str = Config.SCRAPE_QUEUE_PATH, lease: float = Config.SCRAPE_JOB_TIMEOUT,
+                 attempts: int = Config.SCRAPE_JOB_ATTEMPTS, expire_on_claim: bool = True):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = attempts
+        self.expire_on_claim = expire_on_claim  # False under supervise(): it expires leases after killing
+        self._local = threading.local()
+        self._completions = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, dedup TEXT NOT NULL, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL, worker TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL, claimed_at REAL, finished_at REAL, result TEXT, error TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs(dedup, status)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _tx(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            out = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return out
+
+    def submit(self, kind, payload):
+        dedup = _dedup_key(kind, payload)
+
+        def tx(conn):
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedup = ? AND status IN ('queued', 'running') LIMIT 1", (dedup,)
+            ).fetchone()
+            if row:
+                return row[0]
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs(id, kind, dedup, payload, status, created) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, dedup, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+            return job_id
+
+        return self._tx(tx)
+
+    def result(self, job_id, timeout=Config.SCRAPE_JOB_WAIT):
+        deadline = time.monotonic() + timeout
+        delay = self.POLL_MIN
+        while True:
+            row = self._conn().execute("SELECT status, result, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise JobFailed(f"unknown job {job_id}")
+            if row[0] == "done":
+                return json.loads(row[1])
+            if row[0] == "failed":
+                raise JobFailed(row[2] or "failed")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"job {job_id} not finished in {timeout}s")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.POLL_MAX)
+
+    def _requeue_expired(self, conn, now):
+        conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,"
+            " error = 'lease expired', worker = NULL, finished_at = CASE WHEN attempts >= ? THEN ? END"
+            " WHERE status = 'running' AND claimed_at < ?",
+            (self.max_attempts, self.max_attempts, now, now - self.lease),
+        )
+
+    def expire_leases(self):
+        self._tx(lambda conn: self._requeue_expired(conn, time.time()))
+
+    def claim(self, worker, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        delay = self.POLL_MIN
+
+        def tx(conn):
+            now = time.time()
+            if self.expire_on_claim:
+                self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, now, row[0]),
+            )
+            return Job(row[0], row[1], json.loads(row[2]), row[3] + 1)
+
+        while True:
+            job = self._tx(tx)
+            if job is not None:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.POLL_MAX)
+
+    def complete(self, job_id, result, worker):
+        conn = self._conn()
+        conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, finished_at = ?"
+            " WHERE id = ? AND status = 'running' AND worker = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker),
+        )
+        self._completions += 1
+        if self._completions % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                         (time.time() - self.KEEP_FINISHED,))
+
+    def fail(self, job_id, error, retry=True, worker=None):
+        max_attempts = self.max_attempts if retry else 0
+        self._conn().execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,"
+            " error = ?, worker = NULL, finished_at = CASE WHEN attempts >= ? THEN ? END"
+            " WHERE id = ? AND status = 'running' AND (? IS NULL OR worker = ?)",
+            (max_attempts, str(error)[:500], max_attempts, time.time(), job_id, worker, worker),
+        )
+
+    def running(self):
+        rows = self._conn().execute("SELECT id, worker, claimed_at FROM jobs WHERE status = 'running'").fetchall()
+        return [{"id": r[0], "worker": r[1], "claimed_at": r[2]} for r in rows]
+
+    def stats(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {"queued": 0, "running": 0, "done": 0, "failed": 0, **dict(rows)}
+
+
+def create_broker(backend: str = Config.SCRAPE_QUEUE_BACKEND) -> Optional[ScrapeBroker]:
+    backend = (backend or "inline").lower()
+    if backend == "sqlite":
+        return SQLiteBroker()
+    if backend == "memory":
+        return MemoryBroker()
+    return None  # inline: no queue
+
+
+_broker: Optional[ScrapeBroker] = None
+_broker_ready = False
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> Optional[ScrapeBroker]:
+    """Process-wide broker (None = scrape inline). The memory backend gets its worker threads here."""
+    global _broker, _broker_ready
+    with _broker_lock:
+        if not _broker_ready:
+            _broker = create_broker()
+            if isinstance(_broker, MemoryBroker):
+                for _ in range(Config.SCRAPE_WORKERS):
+                    threading.Thread(target=run_worker, args=(_broker,), name="scrape-worker", daemon=True).start()
+            _broker_ready = True
+        return _broker
+
+
+# ---------------- Worker ----------------
+def _handlers() -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    from modules.search import details_local, scrape_local  # lazy: search imports this module
+
+    return {
+        "search": lambda p: scrape_local(tuple(p["key"])),
+        "details": lambda p: details_local(tuple(p["key"]), p["train"]),
+    }
+
+
+def run_worker(broker: ScrapeBroker, max_jobs: int = 0, stop: Optional[threading.Event] = None) -> int:
+    """Claims and runs jobs until `max_jobs` are done (0 = forever) or `stop` is set."""
+    handlers = _handlers()
+    me = worker_id()
+    done = 0
+    while not (stop and stop.is_set()):
+        job = broker.claim(me)
+        if job is None:
+            continue
+        try:
+            handler = handlers[job.kind]
+        except KeyError:
+            broker.fail(job.id, f"unknown job kind {job.kind}", retry=False, worker=me)
+            continue
+        try:
+            broker.complete(job.id, handler(job.payload), me)
+        except Exception as e:
+            logger.error("Scrape job %s fail (attempt %s): %s", job.id, job.attempts, e)
+            broker.fail(job.id, str(e), worker=me)
+        done += 1
+        if max_jobs and done >= max_jobs:
+            break
+    return done
+
+
+def _worker_process(max_jobs: int):
+    run_worker(SQLiteBroker(expire_on_claim=False), max_jobs)
+
+
+def _reap(workers: List[Any], broker: ScrapeBroker, host: str):
+    """Drops dead worker processes and hands their running jobs back to the queue now."""
+    dead = [p for p in workers if not p.is_alive()]
+    if not dead:
+        return
+    for p in dead:
+        p.join()
+        workers.remove(p)
+    prefixes = {f"{host}:{p.pid}:": p for p in dead}
+    for job in broker.running():
+        owner = next((p for prefix, p in prefixes.items() if (job["worker"] or "").startswith(prefix)), None)
+        if owner is not None:
+            logger.warning("Worker %s job %s ke dauran band hua (exit %s), job dobara queue mein",
+                           owner.pid, job["id"], owner.exitcode)
+            broker.fail(job["id"], f"worker exited with code {owner.exitcode}", worker=job["worker"])
+
+
+def _expire_hung(workers: List[Any], broker: ScrapeBroker, host: str):
+    """Kills the owner of every job past its lease, then requeues those jobs (workers don't)."""
+    owners = {f"{host}:{p.pid}:": p for p in workers}
+    now = time.time()
+    for job in broker.running():
+        if now - (job["claimed_at"] or now) <= broker.lease:
+            continue
+        owner = next((p for prefix, p in owners.items() if (job["worker"] or "").startswith(prefix)), None)
+        if owner is not None and owner.is_alive():
+            logger.warning("Worker %s job %s par atka hua hai, restart kar rahe hain", owner.pid, job["id"])
+            owner.kill()
+    broker.expire_leases()  # also covers workers of an earlier supervisor
+
+
+def supervise(processes: int = Config.SCRAPE_WORKERS, max_jobs: int = Config.SCRAPE_WORKER_MAX_JOBS):
+    """Keeps `processes` workers alive; kills a worker whose job ran past the lease."""
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")  # fresh interpreter: no inherited browser/threads
+    broker = SQLiteBroker()
+    host = socket.gethostname()
+    workers: List[Any] = []
+    logger.info("Scrape workers shuru: %s processes, queue %s", processes, broker.path)
+    try:
+        while True:
+            _reap(workers, broker, host)
+            while len(workers) < processes:
+                p = ctx.Process(target=_worker_process, args=(max_jobs,), name="scrape-worker", daemon=True)
+                p.start()
+                workers.append(p)
+            _expire_hung(workers, broker, host)
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in workers:
+            p.terminate()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m modules.scrape_queue")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("worker", help="run scrape worker processes against SCRAPE_QUEUE_PATH")
+    w.add_argument("-n", "--processes", type=int, default=Config.SCRAPE_WORKERS)
+    w.add_argument("--max-jobs", type=int, default=Config.SCRAPE_WORKER_MAX_JOBS,
+                   help="recycle a worker process after this many jobs (0 = never)")
+    sub.add_parser("stats", help="job counts by status")
+    args = parser.parse_args(argv)
+    if args.cmd == "worker":
+        supervise(args.processes, args.max_jobs)
+    else:
+        print(json.dumps(SQLiteBroker().stats()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,6 +18,44 @@ import glob
 from pathlib import Path
 from config.settings import Config
 from modules.utils import Logger, DataManager
+from modules.fetch_archive import get_archive
+from modules.browser_pool import get_shared_browser
+from modules import latency
+from modules.rate_limit import RETRYABLE_ERRORS, RetryableStatus, limiter_for, parse_retry_after, with_retries
+from modules import http_cache, resource_block
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+# Hedged fetches: primaries and backups get separate pools so a burst of slow
+# primaries can never leave the backups that should rescue them without a worker
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=Config.HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+_HEDGE_BACKUP_POOL = ThreadPoolExecutor(max_workers=Config.HEDGE_BACKUP_POOL_SIZE, thread_name_prefix="hedge-backup")
+_HEDGE_STATS = {"fired": 0, "won": 0}
+_HEDGE_LOCK = threading.Lock()
+
+def _hedge_count(name):
+    with _HEDGE_LOCK:
+        _HEDGE_STATS[name] += 1
+
+def _hedge_snapshot():
+    with _HEDGE_LOCK:
+        return dict(_HEDGE_STATS)
+
+def fetch_stats():
+    """Scraper-side metrics: per-host limiter, per-tier latency, hedging, blocking, HTTP cache"""
+    from modules import browser_pool, rate_limit
+    stats = {
+        "hosts": rate_limit.all_stats(),
+        "latency": latency.all_stats(),
+        "hedge": _hedge_snapshot(),
+    }
+    if Config.RESOURCE_BLOCKING_ENABLED:
+        stats["resource_blocking"] = resource_block.stats()
+    if Config.HTTP_CACHE_ENABLED:
+        stats["http_cache"] = http_cache.get_http_cache().stats()
+    if browser_pool._shared is not None:
+        stats["shared_browser"] = browser_pool._shared.stats()
+    return stats
 
 class PakRailScraper:
     def __init__(self):
@@ -26,7 +64,17 @@ class PakRailScraper:
         self.driver = None
         self.wait = None
         self.session = None
-        self.setup_driver()
+        self.browser = None
+        self.last_tier = None
+
+        # live | record | replay (see modules/fetch_archive.py)
+        self.fetch_mode = (self.config.SCRAPER_FETCH_MODE or "live").lower()
+        self.archive = get_archive(self.config.SCRAPER_ARCHIVE_DIR) if self.fetch_mode in ("record", "replay") else None
+
+        if self.fetch_mode == "replay":
+            self.logger.info("Replay mode: pages archive se aayenge (no browser/network)")
+        else:
+            self.setup_driver()
     
     def find_chrome_driver_path(self):
         """Find correct Chrome driver executable"""
@@ -174,6 +222,14 @@ class PakRailScraper:
     
     def setup_chrome_driver_advanced(self):
         """Advanced Chrome driver setup with multiple fallbacks"""
+        self.driver = self.create_chrome_driver()
+        if not self.driver:
+            return False
+        self.wait = WebDriverWait(self.driver, self.config.SELENIUM_TIMEOUT)
+        return True
+    
+    def create_chrome_driver(self, page_load_strategy="normal"):
+        """Find/download chromedriver and start a configured headless Chrome (None on failure)"""
         try:
             # Method 1: Find existing driver
             driver_path = self.find_chrome_driver_path()
@@ -205,12 +261,12 @@ class PakRailScraper:
             
             if not driver_path:
                 self.logger.error("Chrome driver setup completely failed!")
-                return False
+                return None
             
             # Verify the driver works
             if not self.test_chrome_driver(driver_path):
                 self.logger.error("Chrome driver test failed!")
-                return False
+                return None
             
             # Setup Chrome options
             chrome_options = Options()
@@ -219,11 +275,13 @@ class PakRailScraper:
             chrome_options.add_argument('--disable-dev-shm-usage')
             chrome_options.add_argument('--disable-gpu')
             chrome_options.add_argument('--disable-extensions')
-            chrome_options.add_argument('--disable-images')
             chrome_options.add_argument('--window-size=1920,1080')
             chrome_options.add_argument('--disable-blink-features=AutomationControlled')
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
+            chrome_options.page_load_strategy = page_load_strategy
+            if self.config.RESOURCE_BLOCKING_ENABLED:
+                resource_block.configure_options(chrome_options)
             
             # User agent
             user_agent = random.choice(self.config.USER_AGENTS)
@@ -231,23 +289,25 @@ class PakRailScraper:
             
             # Create driver
             service = Service(driver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            driver = webdriver.Chrome(service=service, options=chrome_options)
             
             # Hide webdriver property
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            # Set timeouts
-            self.driver.implicitly_wait(self.config.IMPLICIT_WAIT)
-            self.driver.set_page_load_timeout(self.config.PAGE_LOAD_TIMEOUT)
+            # Images/fonts/CSS/trackers are dropped before they reach the network
+            if self.config.RESOURCE_BLOCKING_ENABLED and not resource_block.apply(driver):
+                self.logger.warning("Resource blocking DevTools se set nahi ho saka")
             
-            self.wait = WebDriverWait(self.driver, self.config.SELENIUM_TIMEOUT)
+            # Set timeouts
+            driver.implicitly_wait(self.config.IMPLICIT_WAIT)
+            driver.set_page_load_timeout(self.config.PAGE_LOAD_TIMEOUT)
             
             self.logger.info("Chrome driver successfully setup!")
-            return True
+            return driver
             
         except Exception as e:
             self.logger.error(f"Advanced Chrome setup failed: {str(e)}")
-            return False
+            return None
     
     def test_chrome_driver(self, driver_path):
         """Test if Chrome driver works"""
@@ -267,38 +327,52 @@ class PakRailScraper:
             self.logger.warning(f"Chrome driver test error: {str(e)}")
             return False
     
+    def _build_http_session(self):
+        """requests session with browser-like headers (and the HTTP cache, if on)"""
+        session = requests.Session()
+        
+        # Headers to mimic browser
+        headers = {
+            'User-Agent': random.choice(self.config.USER_AGENTS),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        }
+        
+        session.headers.update(headers)
+        if self.config.HTTP_CACHE_ENABLED:
+            http_cache.install(session)
+        return session
+    
     def setup_driver_alternative(self):
         """Alternative driver setup using requests-based scraping"""
         try:
             self.logger.info("Alternative scraping method setup kar rahe hain...")
             
             # Setup session for requests-based scraping
-            self.session = requests.Session()
-            
-            # Headers to mimic browser
-            headers = {
-                'User-Agent': random.choice(self.config.USER_AGENTS),
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-            
-            self.session.headers.update(headers)
+            self.session = self._build_http_session()
             
             self.logger.info("Alternative scraping method ready!")
             return True
             
         except Exception as e:
-            self.logger.error(f"Alternative setup mein error: {str(e)}")
+            self.logger.error("Alternative setup mein error: %s", e)
             return False
     
     def setup_driver(self):
         """Main driver setup with fallback mechanisms"""
         try:
-            # Try Chrome driver first
+            # Shared Chromium: searches become isolated tabs of one process
+            if self.config.SCRAPER_SHARED_BROWSER:
+                self.browser = get_shared_browser(lambda: self.create_chrome_driver(page_load_strategy="none"))
+                return self.setup_driver_alternative()
+            
+            # Try Chrome driver first; keep a requests session as the hedge backup tier
             if self.setup_chrome_driver_advanced():
+                if self.config.HEDGE_ENABLED:
+                    self.session = self._build_http_session()
                 return True
             
             # Fallback to requests
@@ -306,14 +380,140 @@ class PakRailScraper:
             return self.setup_driver_alternative()
             
         except Exception as e:
-            self.logger.error(f"Complete driver setup failed: {str(e)}")
+            self.logger.error("Complete driver setup failed: %s", e)
             return self.setup_driver_alternative()
     
+    def _active_tier(self):
+        if self.fetch_mode == "replay":
+            return "replay"
+        if self.browser:
+            return "tab"
+        return "selenium" if self.driver else "requests"
+    
+    # ---------------- Fetch tiers ----------------
+    def _observed(self, tier, fn):
+        """Run one tier fetch and feed its latency tracker"""
+        started = time.time()
+        try:
+            result = fn()
+        except TimeoutException:
+            latency.tracker(tier).observe_timeout()
+            raise
+        except WebDriverException as e:
+            # Chrome network failures (net::ERR_*) get the same backoff/retry as requests' ConnectionError
+            if "net::ERR_" in (e.msg or ""):
+                raise ConnectionError(e.msg) from e
+            raise
+        latency.tracker(tier).observe(time.time() - started)
+        return result
+    
+    def _timed(self, tier, url, fn):
+        """Run one tier fetch inside the host limiter and feed its latency tracker"""
+        with limiter_for(url).slot():
+            return self._observed(tier, fn)
+    
+    def _fetch_tab(self, url):
+        timeout = latency.tracker("tab").timeout(self.config.PAGE_LOAD_TIMEOUT)
+        # host slot first: a tab is only opened once the request may actually go out
+        with limiter_for(url).slot(), self.browser.tab() as tab:
+            body = self._observed("tab", lambda: tab.get(url, timeout=timeout))
+            if self.config.RESOURCE_BLOCKING_ENABLED:
+                resource_block.record_page(url, self.browser.page_traffic(tab), self.logger)
+        return body, 200, "tab"
+    
+    def _fetch_selenium(self, url):
+        self.driver.set_page_load_timeout(latency.tracker("selenium").timeout(self.config.PAGE_LOAD_TIMEOUT))
+        if self.config.RESOURCE_BLOCKING_ENABLED:
+            resource_block.drain(self.driver)  # discard traffic from earlier pages
+        self._timed("selenium", url, lambda: self.driver.get(url))
+        if self.config.RESOURCE_BLOCKING_ENABLED:
+            resource_block.record_page(url, resource_block.drain(self.driver), self.logger)
+        return self.driver.page_source, 200, "selenium"
+    
+    def _fetch_http(self, url):
+        timeout = latency.tracker("http").timeout(self.config.HTTP_TIMEOUT)
+        try:
+            response = self._timed("http", url, lambda: self.session.get(url, timeout=timeout))
+        except requests.Timeout:
+            latency.tracker("http").observe_timeout()
+            raise
+        if response.status_code in (429, 503):
+            raise RetryableStatus(response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+        return response.text, response.status_code, "http"
+    
+    def _fetch_hedged(self, primary, backup, tier):
+        """
+        Primary fetch; if it runs past its observed p95, fire the backup too and
+        take whichever succeeds first. Loser keeps running and is ignored.
+        """
+        delay = latency.tracker(tier).hedge_delay() if self.config.HEDGE_ENABLED else None
+        if backup is None or delay is None:
+            try:
+                return primary()
+            except Exception as e:
+                if backup is None:
+                    raise
+                self.logger.warning("%s fetch fail, HTTP tier try kar rahe hain: %s", tier, e)
+                return backup()
+        
+        first = _HEDGE_POOL.submit(primary)
+        done, _ = wait([first], timeout=delay)
+        if done and first.exception() is None:
+            return first.result()
+        if done:
+            self.logger.warning("%s fetch fail, HTTP tier try kar rahe hain: %s", tier, first.exception())
+            return backup()
+        
+        _hedge_count("fired")
+        self.logger.info("%s fetch p95 (%.2fs) se slow, hedged HTTP request bhej rahe hain", tier, delay)
+        second = _HEDGE_BACKUP_POOL.submit(backup)
+        error = None
+        for fut in as_completed([first, second]):
+            if fut.exception() is None:
+                if fut is second:
+                    _hedge_count("won")
+                return fut.result()
+            error = fut.exception()
+        raise error
+    
+    def _fetch_live(self, url):
+        backup = (lambda: self._fetch_http(url)) if self.session else None
+        if self.browser:
+            return self._fetch_hedged(lambda: self._fetch_tab(url), backup, "tab")
+        if self.driver:
+            return self._fetch_hedged(lambda: self._fetch_selenium(url), backup, "selenium")
+        if backup:
+            return backup()
+        raise RuntimeError("Koi fetch tier available nahi")
+    
+    def fetch_page(self, url):
+        """Fetch one page via the active tier (archive replay, shared tab, Selenium, requests) and record it if asked"""
+        if self.fetch_mode == "replay":
+            body, _status, _elapsed = self.archive.replay(url, self.config.SCRAPER_REPLAY_LATENCY_SCALE)
+            self.last_tier = "replay"
+            return body
+
+        started = time.time()
+        # Config.MAX_RETRIES attempts with jittered backoff; 429/503 honour Retry-After
+        body, status, tier = with_retries(lambda: self._fetch_live(url), url,
+                                          retry_on=RETRYABLE_ERRORS + (TimeoutException,), logger=self.logger)
+
+        self.last_tier = tier
+        if self.fetch_mode == "record":
+            self.archive.record(url, body, time.time() - started, status, tier)
+        return body
+    
     def generate_sample_data(self, from_station, to_station, travel_date, time_preference=None):
         """Generate realistic sample train data with time preference filtering"""
         try:
             self.logger.info("Sample train data generate kar rahe hain...")
             
+            # Replay runs must be reproducible: seed from the query instead of global random
+            if getattr(self, "fetch_mode", "live") == "replay":
+                rng = random.Random(f"{from_station}|{to_station}|{travel_date}|{time_preference}")
+            else:
+                rng = random
+            
             # All available trains
             all_trains = [
                 {
@@ -417,8 +617,8 @@ class PakRailScraper:
                     'id': f"train_{i+1}",
                     'route': f"{from_station} → {to_station}",
                     'travel_date': travel_date,
-                    'available_seats': random.randint(15, 45),
-                    'train_type': random.choice(['Express', 'Mail', 'Passenger']),
+                    'available_seats': rng.randint(15, 45),
+                    'train_type': rng.choice(['Express', 'Mail', 'Passenger']),
                     'status': 'Available'
                 })
                 # Remove time_category from final data
@@ -428,36 +628,102 @@ class PakRailScraper:
             # Save the data
             DataManager.save_train_data(trains_data)
             
-            self.logger.info(f"Generated {len(trains_data)} trains with time preference: {time_preference}")
+            self.logger.info("Generated %d trains with time preference: %s", len(trains_data), time_preference)
             return trains_data
             
         except Exception as e:
-            self.logger.error(f"Sample data generation mein error: {str(e)}")
+            self.logger.error("Sample data generation mein error: %s", e)
             return []
     
+    # Main line order, used to lay out intermediate stops in sample details
+    MAIN_LINE = [
+        "Karachi", "Hyderabad", "Nawabshah", "Rohri", "Sukkur", "Rahim Yar Khan", "Bahawalpur",
+        "Khanewal", "Multan", "Sahiwal", "Okara", "Lahore", "Gujranwala", "Wazirabad", "Gujrat",
+        "Jhelum", "Rawalpindi", "Islamabad", "Peshawar",
+    ]
+    
+    @classmethod
+    def generate_sample_details(cls, train, from_station, to_station, travel_date):
+        """Sample stop list + per-class seats for one train (same train/date always gives the same answer)"""
+        rng = random.Random(f"{train.get('id')}|{train.get('name')}|{from_station}|{to_station}|{travel_date}")
+        
+        try:
+            n_stops = int(str(train.get('stops') or '0').split()[0])
+        except ValueError:
+            n_stops = 0
+        line = cls.MAIN_LINE
+        if from_station in line and to_station in line:
+            i, j = line.index(from_station), line.index(to_station)
+            between = line[min(i, j) + 1:max(i, j)]
+            if i > j:
+                between = between[::-1]
+        else:
+            between = [s for s in line if s not in (from_station, to_station)]
+            rng.shuffle(between)
+        if len(between) > n_stops:
+            between = sorted(rng.sample(between, n_stops), key=between.index)
+        
+        def minutes(hhmm):
+            h, m = str(hhmm or "00:00").split(":")[:2]
+            return int(h) * 60 + int(m)
+        
+        dep, arr = minutes(train.get('departure_time')), minutes(train.get('arrival_time'))
+        span = (arr - dep) % (24 * 60) or 60
+        stops = []
+        for k, station in enumerate(between, 1):
+            at = dep + span * k // (len(between) + 1)
+            halt = rng.choice([2, 3, 5, 10])
+            stops.append({
+                'station': station,
+                'arrival': f"{(at // 60) % 24:02d}:{at % 60:02d}",
+                'departure': f"{((at + halt) // 60) % 24:02d}:{(at + halt) % 60:02d}",
+            })
+        
+        seats = int(train.get('available_seats') or rng.randint(15, 45))
+        ac = rng.randint(0, seats // 4)
+        business = rng.randint(0, (seats - ac) // 2)
+        return {
+            'id': train.get('id'),
+            'stops': stops,
+            'seats': {'economy': seats - ac - business, 'business': business, 'ac': ac},
+        }
+    
+    def scrape_train_details(self, train, from_station, to_station, travel_date):
+        """Deeper data (stops, seats) for a single train the user asked about"""
+        try:
+            if self.fetch_mode == "replay" or self.browser or self.driver or self.session:
+                try:
+                    self.fetch_page(self.config.PAKRAIL_URL)
+                except Exception as e:
+                    self.logger.warning("Train detail fetch fail, sample details de rahe hain: %s", e)
+            return self.generate_sample_details(train, from_station, to_station, travel_date)
+        finally:
+            self.cleanup()
+    
     def scrape_train_info(self, from_station, to_station, travel_date, time_preference=None):
         """Main scraping method with time preference support"""
         try:
             self.logger.info("Train scraping process shuru kar rahe hain...")
             
-            # If we have Selenium driver, try that first
-            if self.driver:
-                self.logger.info("Selenium method try kar rahe hain...")
+            # Replay archive, shared browser tab, Selenium driver or requests session - whichever is active
+            if self.fetch_mode == "replay" or self.browser or self.driver or self.session:
+                self.logger.info("Page fetch kar rahe hain (%s)...", self._active_tier())
                 
                 try:
-                    self.driver.get(self.config.PAKRAIL_URL)
-                    time.sleep(3)
+                    self.fetch_page(self.config.PAKRAIL_URL)
+                    if self.last_tier == "selenium":
+                        time.sleep(3)
                     self.logger.info("Website access hui, sample data return kar rahe hain")
                     return self.generate_sample_data(from_station, to_station, travel_date, time_preference)
                 except Exception as e:
-                    self.logger.warning(f"Selenium method fail: {str(e)}")
+                    self.logger.warning("Fetch method fail: %s", e)
             
-            # Fallback to requests method
+            # Last tier: sample data only
             self.logger.info("Requests method use kar rahe hain...")
             return self.generate_sample_data(from_station, to_station, travel_date, time_preference)
             
         except Exception as e:
-            self.logger.error(f"Main scraping process mein error: {str(e)}")
+            self.logger.error("Main scraping process mein error: %s", e)
             # Last resort - generate sample data
             return self.generate_sample_data(from_station, to_station, travel_date, time_preference)
         
@@ -471,14 +737,14 @@ class PakRailScraper:
                 self.driver.quit()
                 self.logger.info("Driver successfully close kiya gaya!")
         except Exception as e:
-            self.logger.warning(f"Driver cleanup mein minor error: {str(e)}")
+            self.logger.warning("Driver cleanup mein minor error: %s", e)
         
         try:
             if self.session:
                 self.session.close()
                 self.logger.info("Requests session close kiya gaya!")
         except Exception as e:
-            self.logger.warning(f"Session cleanup mein minor error: {str(e)}")
+            self.logger.warning("Session cleanup mein minor error: %s", e)
 
 if __name__ == "__main__":
     scraper = PakRailScraper()
@@ -0,0 +1,212 @@
+# modules/search.py
+# Single entry point for train searches: result cache, then offline snapshot, scraper last.
+# Chat agent, API and background prefetch all go through here.
+
+import copy
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+from config.settings import Config
+from modules.fare_history import record_search
+from modules.prefetch import PrefetchScheduler, QueryTracker, ResultCache, SearchKey
+from modules.scrape_queue import JobFailed, get_broker
+from modules.scraper import PakRailScraper
+from modules.snapshot import snapshot_lookup
+from modules.utils import Logger
+
+logger = Logger("TrainSearch")
+
+RESULT_CACHE = ResultCache()
+QUERY_TRACKER = QueryTracker()
+_scheduler: Optional[PrefetchScheduler] = None
+
+
+def make_key(from_station, to_station, travel_date, time_preference=None) -> SearchKey:
+    return (
+        str(from_station or "").strip().title(),
+        str(to_station or "").strip().title(),
+        str(travel_date or "").strip(),
+        str(time_preference or "").strip().lower(),
+    )
+
+
+def scrape_local(key: SearchKey) -> List[Dict[str, Any]]:
+    """The actual scrape; runs in this process (inline backend) or in a scrape worker."""
+    from_station, to_station, travel_date, time_pref = key
+    scraper = PakRailScraper()
+    results = scraper.scrape_train_info(from_station, to_station, travel_date, time_pref or None)
+    if results:
+        record_search(key, results)
+    return results
+
+
+def _via_queue(kind: str, payload: Dict[str, Any], local):
+    broker = get_broker()
+    if broker is None:
+        return local()
+    try:
+        return broker.call(kind, payload)
+    except (JobFailed, TimeoutError) as e:
+        logger.error("Scrape job (%s) fail: %s", kind, e)
+        return None
+
+
+def scrape_and_store(key: SearchKey) -> List[Dict[str, Any]]:
+    """Always scrape (slow path) and refresh the cache entry."""
+    results = _via_queue("search", {"key": list(key)}, lambda: scrape_local(key)) or []
+    if results:
+        RESULT_CACHE.put(key, results)
+    return results
+
+
+def _lookup(key: SearchKey) -> List[Dict[str, Any]]:
+    cached = RESULT_CACHE.get(key)
+    if cached is not None:
+        logger.info("Cache hit: %s → %s %s", key[0], key[1], key[2])
+        return cached
+
+    # Offline snapshot answers cold queries instantly; recording the key above
+    # lets the prefetch scheduler refresh it from the live site in the background.
+    snap = snapshot_lookup(*key)
+    if snap:
+        logger.info("Snapshot hit: %s → %s %s", key[0], key[1], key[2])
+        return snap
+    return scrape_and_store(key)
+
+
+def search_trains(from_station, to_station, travel_date, time_preference=None) -> List[Dict[str, Any]]:
+    key = make_key(from_station, to_station, travel_date, time_preference)
+    QUERY_TRACKER.record(key)
+    return _lookup(key)
+
+
+# ---------------- Per-train details ----------------
+DETAIL_CACHE = ResultCache()
+
+
+def details_local(key: SearchKey, train: Dict[str, Any]) -> Dict[str, Any]:
+    # Only fetch on a cheap tier (a tab of the shared browser, archive replay);
+    # otherwise every detail question would start and quit a whole Chrome, so
+    # the answer is built from the stored result row instead.
+    if Config.SCRAPER_SHARED_BROWSER or Config.SCRAPER_FETCH_MODE.lower() == "replay":
+        return PakRailScraper().scrape_train_details(train, key[0], key[1], key[2])
+    return PakRailScraper.generate_sample_details(train, key[0], key[1], key[2])
+
+
+def train_details(key: SearchKey, train: Dict[str, Any]) -> Dict[str, Any]:
+    """Stops/seats for one train of a shown result set; scraped only on first ask."""
+    detail_key = tuple(key) + (str(train.get("id") or train.get("name")),)
+    cached = DETAIL_CACHE.get(detail_key)
+    if cached is not None:
+        return cached
+    details = _via_queue("details", {"key": list(key), "train": train}, lambda: details_local(key, train)) or {}
+    if details:
+        DETAIL_CACHE.put(detail_key, details)
+    return details
+
+
+# ---------------- Speculative search ----------------
+# The chat agent starts the search as soon as all slots are known; the confirm
+# turn then attaches to the running (or finished) lookup instead of starting one.
+# Registry is per process and keyed by SearchKey, so identical queries share work;
+# each entry counts the sessions holding it and is only dropped (and its lookup
+# cancelled) when the last of them claims or discards it.
+class _SpecEntry:
+    __slots__ = ("started", "future", "holders")
+
+    def __init__(self, future: Future):
+        self.started = time.time()
+        self.future = future
+        self.holders = 1
+
+
+_SPEC_POOL = ThreadPoolExecutor(max_workers=Config.SPECULATIVE_WORKERS, thread_name_prefix="spec-search")
+_speculative: Dict[SearchKey, _SpecEntry] = {}
+_spec_lock = threading.Lock()
+SPEC_STATS = {"started": 0, "shared": 0, "claimed": 0, "discarded": 0}
+
+
+def start_speculative(key: SearchKey):
+    now = time.time()
+    with _spec_lock:
+        # forget results nobody came back for
+        for k in [k for k, e in _speculative.items() if e.future.done() and now - e.started > Config.SPECULATIVE_TTL]:
+            del _speculative[k]
+        entry = _speculative.get(key)
+        if entry is not None:
+            entry.holders += 1
+            SPEC_STATS["shared"] += 1
+            return
+        _speculative[key] = _SpecEntry(_SPEC_POOL.submit(_lookup, key))
+        SPEC_STATS["started"] += 1
+    logger.info("Speculative search shuru: %s → %s %s", key[0], key[1], key[2])
+
+
+def _release_speculative(key: SearchKey) -> Optional[_SpecEntry]:
+    """Drops one holder (caller holds _spec_lock); the entry leaves the registry with its last holder."""
+    entry = _speculative.get(key)
+    if entry is None:
+        return None
+    entry.holders -= 1
+    if entry.holders <= 0:
+        del _speculative[key]
+    return entry
+
+
+def discard_speculative(key: SearchKey):
+    """Slots changed or user declined. Other sessions holding the same key keep
+    it; once nobody does, a lookup that already started is left to finish (it
+    still warms the result cache) but nobody attaches to it."""
+    with _spec_lock:
+        entry = _release_speculative(key)
+        if entry is None:
+            return
+        SPEC_STATS["discarded"] += 1
+        last = entry.holders <= 0
+    if last:
+        entry.future.cancel()
+
+
+def claim_speculative(key: SearchKey, timeout: float = Config.SPECULATIVE_WAIT) -> Optional[List[Dict[str, Any]]]:
+    """Result of the speculative lookup for key (waiting for it if needed); None -> search normally."""
+    with _spec_lock:
+        entry = _release_speculative(key)
+    if entry is None:
+        return None
+    try:
+        results = entry.future.result(timeout=timeout)
+    except (CancelledError, FutureTimeout):
+        return None
+    except Exception as e:
+        logger.warning("Speculative search fail: %s", e)
+        return None
+    QUERY_TRACKER.record(key)
+    with _spec_lock:
+        SPEC_STATS["claimed"] += 1
+    return copy.deepcopy(results)
+
+
+def speculative_stats() -> Dict[str, int]:
+    with _spec_lock:
+        return dict(SPEC_STATS, pending=len(_speculative))
+
+
+# ---------------- Prefetch lifecycle ----------------
+def get_scheduler() -> PrefetchScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PrefetchScheduler(scrape_and_store, RESULT_CACHE, QUERY_TRACKER)
+    return _scheduler
+
+
+def start_prefetch():
+    if Config.PREFETCH_ENABLED:
+        get_scheduler().start()
+
+
+def stop_prefetch():
+    if _scheduler is not None:
+        _scheduler.stop()
@@ -0,0 +1,125 @@
+# modules/session_queue.py
+# Per-session turn ordering for the API.
+#
+# Every session gets a small FIFO of in-flight turns, created on first use and
+# dropped when it empties. A turn runs only when it is at the head of its own
+# session's queue, so load -> process -> save of one session never interleaves
+# (double clicks, frontend retries), while turns of different sessions never wait
+# on each other. A turn whose (normalised) message equals the last one queued or
+# running for that session is not run again: it gets the same reply.
+#
+# Waiting callers hold a server worker thread, so waits are bounded: a session
+# takes at most `max_depth` callers at a time and none waits longer than
+# `max_wait`; past either limit SessionBusy is raised (the API answers 429).
+#
+# Ordering is per process; with several workers the session store is still
+# shared, so a client should keep one session on one worker (sticky routing).
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Deque, Dict
+
+RESET = "\x00reset"  # key used by /api/reset; never collapses with a message
+
+
+class SessionBusy(Exception):
+    """Session already has max_depth callers, or the turn waited past max_wait."""
+
+
+class _Turn:
+    __slots__ = ("key", "future")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.future: Future = Future()
+
+
+class _SessionActor:
+    __slots__ = ("cond", "turns", "users")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.turns: Deque[_Turn] = deque()
+        self.users = 0
+
+
+def message_key(message: str) -> str:
+    return " ".join(str(message or "").split()).lower()
+
+
+class SessionQueues:
+    def __init__(self, max_depth: int = 4, max_wait: float = 30.0):
+        self.max_depth = max_depth
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._actors: Dict[str, _SessionActor] = {}
+        self._stats = {"turns": 0, "waited": 0, "collapsed": 0, "rejected": 0, "timed_out": 0, "max_depth": 0}
+
+    def run(self, session_id: str, key: str, fn: Callable[[], Any]) -> Any:
+        """Runs fn() in this session's FIFO order; returns its result (or the duplicate's)."""
+        with self._lock:
+            actor = self._actors.get(session_id)
+            if actor is None:
+                actor = self._actors[session_id] = _SessionActor()
+            actor.users += 1
+            busy = actor.users > self.max_depth
+        try:
+            if busy:
+                self._count("rejected")
+                raise SessionBusy(session_id)
+            with actor.cond:
+                # only the newest turn can be a retry of this one: with A, B, A' queued,
+                # A' must see B's effect, so it runs instead of reusing A's reply
+                tail = actor.turns[-1] if actor.turns else None
+                duplicate = tail if tail is not None and key != RESET and tail.key == key else None
+                if duplicate is None:
+                    turn = _Turn(key)
+                    actor.turns.append(turn)
+                    depth = len(actor.turns)
+            if duplicate is not None:
+                self._count("collapsed")
+                try:
+                    return duplicate.future.result(timeout=self.max_wait)
+                except FutureTimeout:
+                    self._count("timed_out")
+                    raise SessionBusy(session_id) from None
+
+            self._count("turns", waited=depth > 1, depth=depth)
+            with actor.cond:
+                if not actor.cond.wait_for(lambda: actor.turns[0] is turn, timeout=self.max_wait):
+                    actor.turns.remove(turn)
+                    actor.cond.notify_all()
+                    turn.future.set_exception(SessionBusy(session_id))  # duplicates attached to it
+                    self._count("timed_out")
+                    raise SessionBusy(session_id)
+            try:
+                result = fn()
+            except BaseException as e:
+                turn.future.set_exception(e)
+                raise
+            else:
+                turn.future.set_result(result)
+                return result
+            finally:
+                with actor.cond:
+                    actor.turns.popleft()
+                    actor.cond.notify_all()
+        finally:
+            with self._lock:
+                actor.users -= 1
+                if actor.users == 0:
+                    del self._actors[session_id]
+
+    def _count(self, name: str, waited: bool = False, depth: int = 0):
+        with self._lock:
+            self._stats[name] += 1
+            if waited:
+                self._stats["waited"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, active_sessions=len(self._actors))
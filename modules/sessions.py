@@ -0,0 +1,265 @@
+# modules/sessions.py
+# Pluggable conversation session stores so the API can run several worker processes.
+#
+#   memory  -> in-process dict (single worker, default)
+#   sqlite  -> one file shared by all workers on the host (WAL mode)
+#   redis   -> network store shared by all nodes (any client with get/set/delete)
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import Config
+
+try:
+    import orjson as _json
+
+    def _dumps(obj) -> bytes:
+        return _json.dumps(obj)
+except Exception:  # orjson optional
+    import json as _json
+
+    def _dumps(obj) -> bytes:
+        return _json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+_loads = _json.loads
+
+# Positional layout keeps payloads tiny (~100 bytes) and decoding cheap
+SESSION_VERSION = 4
+STATE_FIELDS = ("stage", "from_station", "to_station", "travel_date", "budget", "preferred_time", "format_pref")
+# Last shown results are kept as positional rows too (no per-row key names in the payload)
+RESULT_FIELDS = ("id", "name", "departure_time", "arrival_time", "duration", "economy_fare",
+                 "business_fare", "ac_fare", "stops", "available_seats", "train_type", "status")
+
+
+class SessionRecord:
+    """
+    Everything a conversation needs between turns: FSM slots + LLM counters
+    + the key of the speculative search started for the current slots (if any)
+    + the last result set shown, for "2" / "train_2" follow-ups.
+    Slotted (no per-instance __dict__); mapping-style access keeps the FSM code unchanged.
+    """
+
+    __slots__ = STATE_FIELDS + ("llm_calls", "degrade_mode", "spec_key", "results_key", "results")
+
+    def __init__(self, degrade_mode: bool = False):
+        self.reset()
+        self.degrade_mode = degrade_mode
+
+    def reset(self):
+        self.stage = "init"
+        self.from_station = None
+        self.to_station = None
+        self.travel_date = None      # YYYY-MM-DD
+        self.budget = None           # "Economy Class" | "Business Class" | "AC Class" | "Rs. 3000"
+        self.preferred_time = None   # "subah" | "dopahar" | "raat"
+        self.format_pref = None      # optional: "table" | "list" | "json"
+        self.llm_calls = 0
+        self.degrade_mode = False
+        self.spec_key = None         # SearchKey tuple of the in-flight speculative search
+        self.results_key = None      # SearchKey of the last shown results
+        self.results = None          # rows as lists in RESULT_FIELDS order
+
+    # mapping-style access (state["stage"], state.get(...), state.update({...}))
+    def __getitem__(self, key: str):
+        if key not in STATE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in STATE_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in STATE_FIELDS else default
+
+    def update(self, values: Dict[str, Any]):
+        for k, v in values.items():
+            self[k] = v
+
+    # last result set: stored positionally, looked up by row number, train id or name
+    def set_results(self, key, rows: List[Dict[str, Any]]):
+        self.results_key = tuple(key)
+        self.results = [[r.get(f) for f in RESULT_FIELDS] for r in rows]
+
+    def result_rows(self) -> List[Dict[str, Any]]:
+        return [dict(zip(RESULT_FIELDS, row)) for row in (self.results or [])]
+
+    def find_result(self, text: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """(row number, row) for "2", "no. 2", "train_2" or a train name; None if nothing matches."""
+        rows = self.result_rows()
+        if not rows:
+            return None
+        t = re.sub(r"\s+", " ", (text or "")).strip().lower()
+        index = {}
+        for i, row in enumerate(rows, 1):
+            index[str(i)] = (i, row)
+            if row.get("id"):
+                index[str(row["id"]).lower()] = (i, row)
+        m = re.search(r"\btrain_\d+\b", t) or re.search(r"\b\d{1,2}\b", t)
+        if m and m.group(0) in index:
+            return index[m.group(0)]
+        named = [(i, row) for i, row in enumerate(rows, 1)
+                 if row.get("name") and (str(row["name"]).lower() in t or (len(t) >= 4 and t in str(row["name"]).lower()))]
+        return named[0] if len(named) == 1 else None  # "express" alone is ambiguous
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in STATE_FIELDS}
+
+    def to_list(self) -> list:
+        return [getattr(self, k) for k in STATE_FIELDS] + [
+            self.llm_calls, int(self.degrade_mode), self.spec_key, self.results_key, self.results]
+
+    @classmethod
+    def from_list(cls, values: list) -> "SessionRecord":
+        rec = cls.__new__(cls)
+        for k, v in zip(cls.__slots__, values):
+            setattr(rec, k, v)
+        rec.degrade_mode = bool(rec.degrade_mode)
+        rec.spec_key = tuple(rec.spec_key) if rec.spec_key else None  # JSON has no tuples
+        rec.results_key = tuple(rec.results_key) if rec.results_key else None
+        return rec
+
+
+def encode_session(record: SessionRecord) -> bytes:
+    return _dumps([SESSION_VERSION, *record.to_list()])
+
+
+def decode_session(blob) -> Optional[SessionRecord]:
+    """None for unknown/corrupt payloads (caller starts a fresh session)."""
+    try:
+        data = _loads(blob)
+    except Exception:
+        return None
+    if not isinstance(data, list) or not data or data[0] != SESSION_VERSION or len(data) != len(SessionRecord.__slots__) + 1:
+        return None
+    return SessionRecord.from_list(data[1:])
+
+
+class SessionStore:
+    """Interface: opaque bytes per session id."""
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def save(self, session_id: str, blob: bytes):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    PURGE_EVERY = 500  # saves between expired-entry cleanups
+
+    def __init__(self, ttl: int = Config.SESSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+        self._saves = 0
+
+    def load(self, session_id):
+        with self._lock:
+            entry = self._data.get(session_id)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def save(self, session_id, blob):
+        now = time.time()
+        with self._lock:
+            self._data[session_id] = (now + self.ttl, blob)
+            self._saves += 1
+            if self._saves % self.PURGE_EVERY == 0:
+                # abandoned conversations would otherwise stay in memory forever
+                for sid in [sid for sid, (expires_at, _) in self._data.items() if expires_at < now]:
+                    del self._data[sid]
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Shared across processes on one host; one connection per thread."""
+
+    PURGE_EVERY = 500  # saves between expired-row cleanups
+
+    def __init__(self, path: str = Config.SESSION_DB_PATH, ttl: int = Config.SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._saves = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions(expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at >= ?", (session_id, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def save(self, session_id, blob):
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO sessions(id, data, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+            (session_id, sqlite3.Binary(blob), time.time() + self.ttl),
+        )
+        self._saves += 1
+        if self._saves % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, session_id):
+        self._conn().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Network store. `client` can be any object with redis-py style
+    get(key) / set(key, value, ex=seconds) / delete(key), e.g. a local stand-in.
+    """
+
+    def __init__(self, client=None, url: str = Config.REDIS_URL, ttl: int = Config.SESSION_TTL, prefix: str = "pakrail:session:"):
+        if client is None:
+            import redis  # optional dependency, only for this backend
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def load(self, session_id):
+        return self.client.get(self.prefix + session_id)
+
+    def save(self, session_id, blob):
+        self.client.set(self.prefix + session_id, blob, ex=self.ttl)
+
+    def delete(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+
+def create_session_store(backend: str = Config.SESSION_BACKEND) -> SessionStore:
+    backend = (backend or "memory").lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    return MemorySessionStore()
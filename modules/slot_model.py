@@ -0,0 +1,406 @@
+# modules/slot_model.py
+# Small CPU-only intent + slot model for Roman Urdu / English booking messages.
+#
+# - Averaged perceptron: greedy left-to-right token tagger (FROM/TO/DATE/TIME/BUDGET/FORMAT)
+#   and a bag-of-words intent classifier
+# - Trained on synthetic utterances generated from the FSM's slot vocabulary
+#   (plus made-up city names, so the tagger learns "X se Y" context, not a gazetteer)
+# - Softmax over the perceptron scores gives a per-slot / per-message confidence;
+#   the agent only calls the remote LLM when that confidence is low
+#
+#   python -m modules.slot_model            # (re)train and save to Config.SLOT_MODEL_PATH
+#   python -m modules.slot_model "karachi se lahore kal raat"
+
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import Config
+from modules.utils import Logger
+
+logger = Logger("SlotModel")
+
+MODEL_VERSION = 1
+TAGS = ("O", "FROM", "TO", "DATE", "TIME", "BUDGET", "FORMAT")
+INTENTS = ("search", "confirm", "deny", "reset", "help", "details", "chatter")
+
+_TOKEN_RE = re.compile(r"\d{4}-\d{2}-\d{2}|\d{1,2}[/-]\d{1,2}[/-]\d{4}|[a-z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _shape(tok: str) -> str:
+    if tok.isdigit():
+        return f"d{min(len(tok), 5)}"
+    if tok[0].isdigit():
+        return "date"
+    return "w"
+
+
+# ---------------- Averaged perceptron ----------------
+class AveragedPerceptron:
+    """Multi-class perceptron with lazy weight averaging; weights: feature -> {label: w}."""
+
+    def __init__(self, labels):
+        self.labels = tuple(labels)
+        self.weights: Dict[str, Dict[str, float]] = {}
+        self._totals = defaultdict(float)
+        self._stamps = defaultdict(int)
+        self._i = 0
+
+    def scores(self, features: List[str]) -> Dict[str, float]:
+        scores = dict.fromkeys(self.labels, 0.0)
+        for f in features:
+            w = self.weights.get(f)
+            if w:
+                for label, v in w.items():
+                    scores[label] += v
+        return scores
+
+    def predict(self, features: List[str]) -> Tuple[str, float]:
+        """(label, softmax probability of that label)."""
+        scores = self.scores(features)
+        best = max(self.labels, key=lambda l: (scores[l], l))
+        top = scores[best]
+        z = sum(math.exp(s - top) for s in scores.values())
+        return best, 1.0 / z
+
+    def update(self, truth: str, guess: str, features: List[str]):
+        self._i += 1
+        if truth == guess:
+            return
+        for f in features:
+            w = self.weights.setdefault(f, {})
+            for label, delta in ((truth, 1.0), (guess, -1.0)):
+                key = (f, label)
+                v = w.get(label, 0.0)
+                self._totals[key] += (self._i - self._stamps[key]) * v
+                self._stamps[key] = self._i
+                w[label] = v + delta
+
+    def average(self):
+        for f, w in self.weights.items():
+            for label, v in list(w.items()):
+                key = (f, label)
+                total = self._totals[key] + (self._i - self._stamps[key]) * v
+                avg = round(total / max(1, self._i), 3)
+                if avg:
+                    w[label] = avg
+                else:
+                    del w[label]
+        self.weights = {f: w for f, w in self.weights.items() if w}
+        self._totals.clear()
+        self._stamps.clear()
+
+
+def _token_features(tokens: List[str], i: int, prev_tag: str, prev2_tag: str) -> List[str]:
+    tok = tokens[i]
+    prev = tokens[i - 1] if i > 0 else "<s>"
+    prev2 = tokens[i - 2] if i > 1 else "<s>"
+    nxt = tokens[i + 1] if i + 1 < len(tokens) else "</s>"
+    nxt2 = tokens[i + 2] if i + 2 < len(tokens) else "</s>"
+    return [
+        "b",
+        f"w={tok}",
+        f"s3={tok[-3:]}",
+        f"p3={tok[:3]}",
+        f"sh={_shape(tok)}",
+        f"pw={prev}",
+        f"p2w={prev2}",
+        f"nw={nxt}",
+        f"n2w={nxt2}",
+        f"pt={prev_tag}",
+        f"pt2={prev2_tag}|{prev_tag}",
+        f"pt|w={prev_tag}|{tok}",
+        f"pw|nw={prev}|{nxt}",
+    ]
+
+
+def _intent_features(tokens: List[str]) -> List[str]:
+    feats = ["b", f"len={min(len(tokens), 6)}"]
+    feats += [f"w={t}" for t in tokens]
+    feats += [f"bg={a}|{b}" for a, b in zip(tokens, tokens[1:])]
+    feats += [f"sh={_shape(t)}" for t in tokens if t[0].isdigit()]
+    return feats
+
+
+class SlotModel:
+    def __init__(self):
+        self.tagger = AveragedPerceptron(TAGS)
+        self.intent = AveragedPerceptron(INTENTS)
+
+    # ---------------- Inference ----------------
+    def tag(self, tokens: List[str]) -> List[Tuple[str, float]]:
+        out, p1, p2 = [], "<s>", "<s>"
+        for i in range(len(tokens)):
+            tag, conf = self.tagger.predict(_token_features(tokens, i, p1, p2))
+            out.append((tag, conf))
+            p2, p1 = p1, tag
+        return out
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        """
+        {"intent", "intent_confidence", "slots": {slot: raw span}, "slot_confidence": {slot: p},
+         "confidence": lowest token/intent probability}
+        """
+        tokens = tokenize(text)
+        intent, intent_conf = self.intent.predict(_intent_features(tokens)) if tokens else ("chatter", 1.0)
+        tagged = self.tag(tokens)
+
+        spans: Dict[str, List[str]] = {}
+        confs: Dict[str, float] = {}
+        prev = "O"
+        for tok, (tag, conf) in zip(tokens, tagged):
+            if tag != "O":
+                if tag != prev and tag in spans:
+                    prev = tag
+                    continue  # keep the first span of each slot
+                spans.setdefault(tag, []).append(tok)
+                confs[tag] = min(confs.get(tag, 1.0), conf)
+            prev = tag
+
+        slots = {_SLOT_NAMES[t]: " ".join(v) for t, v in spans.items()}
+        slot_conf = {_SLOT_NAMES[t]: round(c, 3) for t, c in confs.items()}
+        overall = min([intent_conf] + [c for _, c in tagged])
+        return {
+            "intent": intent,
+            "intent_confidence": round(intent_conf, 3),
+            "slots": slots,
+            "slot_confidence": slot_conf,
+            "confidence": round(overall, 3),
+        }
+
+    # ---------------- Training ----------------
+    def train(self, examples: List[Tuple[List[str], List[str], str]], epochs: int = 8, seed: int = 7):
+        rng = random.Random(seed)
+        examples = list(examples)
+        for _ in range(epochs):
+            rng.shuffle(examples)
+            for tokens, tags, intent in examples:
+                p1, p2 = "<s>", "<s>"
+                for i in range(len(tokens)):
+                    feats = _token_features(tokens, i, p1, p2)
+                    guess, _ = self.tagger.predict(feats)
+                    self.tagger.update(tags[i], guess, feats)
+                    p2, p1 = p1, guess
+                feats = _intent_features(tokens)
+                guess, _ = self.intent.predict(feats)
+                self.intent.update(intent, guess, feats)
+        self.tagger.average()
+        self.intent.average()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": MODEL_VERSION, "tagger": self.tagger.weights, "intent": self.intent.weights}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["SlotModel"]:
+        if data.get("version") != MODEL_VERSION:
+            return None
+        model = cls()
+        model.tagger.weights = data["tagger"]
+        model.intent.weights = data["intent"]
+        return model
+
+
+_SLOT_NAMES = {
+    "FROM": "from_station",
+    "TO": "to_station",
+    "DATE": "travel_date",
+    "TIME": "preferred_time",
+    "BUDGET": "budget",
+    "FORMAT": "format_pref",
+}
+
+
+# ---------------- Synthetic training data ----------------
+CITIES = [
+    "Karachi", "Lahore", "Islamabad", "Rawalpindi", "Multan", "Peshawar", "Quetta", "Faisalabad",
+    "Hyderabad", "Sukkur", "Rohri", "Bahawalpur", "Sargodha", "Sialkot", "Gujranwala", "Jhelum",
+    "Sahiwal", "Okara", "Nawabshah", "Khanewal", "Rahim Yar Khan", "Jacobabad", "Mardan", "Attock",
+    "Gujrat", "Wazirabad", "Kotri", "Mirpur Khas", "Dera Ghazi Khan", "Chaman",
+]
+TIMES = ["subah", "morning", "savere", "dopahar", "afternoon", "dopehar", "raat", "night", "sham", "shaam", "evening"]
+BUDGETS = ["economy", "business", "ac", "sasta", "cheap", "economy class", "business class", "ac class", "luxury"]
+FORMATS = ["table", "list", "json"]
+
+_ROUTE = [
+    "{from} se {to}", "{from} se {to} jana hai", "mujhe {from} se {to} jana hai", "{from} se {to} tak",
+    "from {from} to {to}", "{from} to {to}", "i want to go from {from} to {to}", "{to} jana hai {from} se",
+    "{from} se {to} ki train", "{from} to {to} train", "ticket {from} se {to}", "{from} se {to} ka ticket chahiye",
+]
+_FROM_ONLY = ["{from} se", "from {from}", "{from} se jana hai", "main {from} se hun", "{from}", "departure {from}"]
+_TO_ONLY = ["{to} jana hai", "to {to}", "{to} ke liye", "destination {to}", "mujhe {to} jana hai", "going to {to}"]
+_EXTRA = [
+    "{date}", "{date} ko", "{time}", "{time} ko", "{date} {time}", "{time} ki train", "{budget}",
+    "budget {budget}", "{budget} chahiye", "{format} mein dikhayein", "{format} format", "{date} {time} {budget}",
+]
+_FILL = ["", "please", "jaldi", "bhai", "ji", "sir", "thanks"]
+_CONFIRM = ["haan", "han", "ji haan", "yes", "ok", "okay", "theek hai search karo", "haan search karein", "ji", "proceed", "start karo", "kar do"]
+_DENY = ["nahi", "no", "nahin", "na", "ghalat hai", "nahi ye nahi", "no wrong", "cancel"]
+_RESET = ["reset", "restart", "naya search", "dobara shuru", "fresh start"]
+_HELP = ["help", "madad", "kaise karun", "madad chahiye", "how does this work"]
+_DETAILS = ["{n}", "number {n}", "{n} ki tafseel", "train {n}", "train {n} dikhao", "no {n}", "{n} number wali", "details of {n}"]
+_CHATTER = ["acha", "acha theek hai", "shukriya", "thank you", "hmm", "kya haal hai", "theek", "hello", "salam", "assalam o alaikum", "ok thanks", "wah"]
+
+_SYLLABLES = ["ka", "la", "ra", "pur", "bad", "wal", "kot", "sha", "mir", "dar", "gan", "zai", "ab", "tan", "ha", "ni"]
+
+
+def _fake_city(rng) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+
+
+def _date_phrase(rng) -> str:
+    d = datetime.now() + timedelta(days=rng.randint(0, 60))
+    return rng.choice([
+        "aaj", "kal", "parso", "today", "tomorrow",
+        d.strftime("%Y-%m-%d"), d.strftime("%d/%m/%Y"), d.strftime("%d-%m-%Y"),
+    ])
+
+
+def _budget_phrase(rng) -> str:
+    if rng.random() < 0.35:
+        return rng.choice(["rs {}", "{}", "{} rupay", "rs {} tak"]).format(rng.choice([1500, 2000, 2500, 3000, 4500, 5000, 8000]))
+    return rng.choice(BUDGETS)
+
+
+def _render(template: str, values: Dict[str, Tuple[str, str]]) -> Tuple[List[str], List[str]]:
+    tokens, tags = [], []
+    for part in template.split():
+        m = re.fullmatch(r"\{(\w+)\}", part)
+        if m and m.group(1) in values:
+            text, tag = values[m.group(1)]
+            for t in tokenize(text):
+                tokens.append(t)
+                # numbers inside a budget phrase are the only BUDGET tokens that matter; "rs" too
+                tags.append(tag if tag != "BUDGET" or t not in ("tak", "rupay") else "O")
+        else:
+            for t in tokenize(part):
+                tokens.append(t)
+                tags.append("O")
+    return tokens, tags
+
+
+def synthetic_examples(n: int = 4000, seed: int = 11) -> List[Tuple[List[str], List[str], str]]:
+    rng = random.Random(seed)
+    out = []
+
+    def city() -> str:
+        return rng.choice(CITIES) if rng.random() < 0.7 else _fake_city(rng)
+
+    for _ in range(n):
+        fr, to = city(), city()
+        values = {
+            "from": (fr, "FROM"), "to": (to, "TO"), "date": (_date_phrase(rng), "DATE"),
+            "time": (rng.choice(TIMES), "TIME"), "budget": (_budget_phrase(rng), "BUDGET"),
+            "format": (rng.choice(FORMATS), "FORMAT"), "n": (str(rng.randint(1, 9)), "O"),
+        }
+        r = rng.random()
+        if r < 0.45:
+            parts = [rng.choice(_ROUTE if rng.random() < 0.6 else _FROM_ONLY + _TO_ONLY)]
+            parts += rng.sample(_EXTRA, rng.randint(0, 2))
+            if rng.random() < 0.2:
+                rng.shuffle(parts)
+            intent = "search"
+        elif r < 0.62:
+            parts, intent = [rng.choice(_EXTRA)], "search"
+        elif r < 0.70:
+            parts, intent = [rng.choice(_CONFIRM)], "confirm"
+        elif r < 0.77:
+            parts, intent = [rng.choice(_DENY)], "deny"
+        elif r < 0.81:
+            parts, intent = [rng.choice(_RESET)], "reset"
+        elif r < 0.85:
+            parts, intent = [rng.choice(_HELP)], "help"
+        elif r < 0.92:
+            parts, intent = [rng.choice(_DETAILS)], "details"
+        else:
+            parts, intent = [rng.choice(_CHATTER)], "chatter"
+        filler = rng.choice(_FILL)
+        if filler:
+            parts.append(filler)
+        tokens, tags = _render(" ".join(parts), values)
+        if tokens:
+            out.append((tokens, tags, intent))
+    return out
+
+
+def train_model(n: int = 4000, epochs: int = 8) -> SlotModel:
+    model = SlotModel()
+    model.train(synthetic_examples(n), epochs=epochs)
+    return model
+
+
+def save_model(model: SlotModel, path: str = Config.SLOT_MODEL_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(model.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_model(path: str = Config.SLOT_MODEL_PATH) -> Optional[SlotModel]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return SlotModel.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+_model: Optional[SlotModel] = None
+_model_lock = threading.Lock()
+
+
+def get_slot_model() -> SlotModel:
+    """Process-wide model: loaded from disk, or trained (seeded, ~seconds) and saved on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                model = load_model()
+                if model is None:
+                    started = time.time()
+                    model = train_model()
+                    logger.info("Slot model train hua (%.1fs)", time.time() - started)
+                    try:
+                        save_model(model)
+                    except OSError as e:
+                        logger.warning("Slot model save nahi ho saka: %s", e)
+                _model = model
+    return _model
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        model = get_slot_model()
+        for text in argv:
+            started = time.perf_counter()
+            pred = model.predict(text)
+            print(f"{(time.perf_counter() - started) * 1e6:.0f}us", json.dumps(pred, ensure_ascii=False))
+        return
+    started = time.time()
+    model = train_model()
+    save_model(model)
+    held_out = synthetic_examples(1000, seed=99)
+    tok_ok = tok_n = int_ok = 0
+    for tokens, tags, intent in held_out:
+        guess = [t for t, _ in model.tag(tokens)]
+        tok_ok += sum(g == t for g, t in zip(guess, tags))
+        tok_n += len(tags)
+        int_ok += model.intent.predict(_intent_features(tokens))[0] == intent
+    print(f"Trained in {time.time() - started:.1f}s -> {Config.SLOT_MODEL_PATH}")
+    print(f"Held-out token accuracy: {tok_ok / tok_n:.3f}, intent accuracy: {int_ok / len(held_out):.3f}")
+
+
+if __name__ == "__main__":
+    main()
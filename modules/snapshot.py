@@ -0,0 +1,303 @@
+# modules/snapshot.py
+# Offline timetable + fare snapshot in a compact, memory-mapped binary file.
+#
+# Layout (little-endian):
+#   header | string table (utf-8) | index (sorted by key hash) | fixed-size train records
+#
+# Workers mmap the file read-only, so every process shares the same pages and a
+# lookup is a binary search + struct.unpack_from on the mapping (no file parsing).
+
+import argparse
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from itertools import permutations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import Config
+from modules.utils import Logger
+
+MAGIC = b"PRSNAP1\0"
+VERSION = 1
+
+# magic, version, reserved, built_at, n_keys, n_records, strings_off, index_off, records_off
+_HEADER = struct.Struct("<8sHHqIIQQQ")
+# key hash, first record, record count
+_INDEX = struct.Struct("<QIH2x")
+# name (off, len), type (off, len), departure min, arrival min, duration min,
+# economy, business, ac fare (Rs.), stops, available seats
+_RECORD = struct.Struct("<IHIHHHHIIIHH")
+
+TIME_SLOTS = ["", "subah", "dopahar", "raat"]
+
+
+def key_hash(from_station, to_station, travel_date, time_preference=None) -> int:
+    raw = "|".join([
+        str(from_station or "").strip().lower(),
+        str(to_station or "").strip().lower(),
+        str(travel_date or "").strip(),
+        str(time_preference or "").strip().lower(),
+    ])
+    return int.from_bytes(hashlib.blake2b(raw.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# ---------------- Field packing helpers ----------------
+def _minutes(hhmm: str) -> int:
+    m = re.match(r"\s*(\d{1,2}):(\d{2})", str(hhmm or ""))
+    return int(m.group(1)) * 60 + int(m.group(2)) if m else 0xFFFF
+
+
+def _hhmm(minutes: int) -> str:
+    return "-" if minutes == 0xFFFF else f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _duration_minutes(text: str) -> int:
+    m = re.match(r"\s*(\d+)h\s*(\d+)m", str(text or ""))
+    return int(m.group(1)) * 60 + int(m.group(2)) if m else 0xFFFF
+
+
+def _fare(text: str) -> int:
+    digits = re.sub(r"[^\d]", "", str(text or ""))
+    return int(digits) if digits else 0
+
+
+def _fare_text(amount: int) -> str:
+    return f"Rs. {amount:,}" if amount else "-"
+
+
+def _first_int(text, default=0) -> int:
+    m = re.search(r"\d+", str(text or ""))
+    return int(m.group(0)) if m else default
+
+
+class TimetableSnapshot:
+    """Read-only view over a snapshot file. Safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        st = os.fstat(self._file.fileno())
+        self.file_id = (st.st_ino, st.st_mtime_ns, st.st_size)  # write_snapshot replaces the file -> new id
+        (magic, version, _r, self.built_at, self.n_keys, self.n_records,
+         self._strings_off, self._index_off, self._records_off) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot file: {path}")
+
+    def close(self):
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.built_at
+
+    def _string(self, off: int, length: int) -> str:
+        start = self._strings_off + off
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _find(self, h: int) -> Optional[Tuple[int, int]]:
+        lo, hi = 0, self.n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mh, first, count = _INDEX.unpack_from(self._mm, self._index_off + mid * _INDEX.size)
+            if mh < h:
+                lo = mid + 1
+            elif mh > h:
+                hi = mid
+            else:
+                return first, count
+        return None
+
+    def lookup(self, from_station, to_station, travel_date, time_preference=None) -> Optional[List[Dict[str, Any]]]:
+        hit = self._find(key_hash(from_station, to_station, travel_date, time_preference))
+        if hit is None:
+            return None
+        first, count = hit
+        results = []
+        for i in range(count):
+            (name_off, name_len, type_off, type_len, dep, arr, dur,
+             economy, business, ac, stops, seats) = _RECORD.unpack_from(
+                self._mm, self._records_off + (first + i) * _RECORD.size)
+            results.append({
+                "name": self._string(name_off, name_len),
+                "departure_time": _hhmm(dep),
+                "arrival_time": _hhmm(arr),
+                "economy_fare": _fare_text(economy),
+                "business_fare": _fare_text(business),
+                "ac_fare": _fare_text(ac),
+                "stops": f"{stops} stops",
+                "duration": "-" if dur == 0xFFFF else f"{dur // 60}h {dur % 60}m",
+                "id": f"train_{i + 1}",
+                "route": f"{str(from_station).strip().title()} → {str(to_station).strip().title()}",
+                "travel_date": travel_date,
+                "available_seats": seats,
+                "train_type": self._string(type_off, type_len),
+                "status": "Available",
+            })
+        return results
+
+
+# ---------------- Writer ----------------
+def write_snapshot(path: str, entries: Iterable[Tuple[Tuple[str, str, str, str], List[Dict[str, Any]]]]):
+    """Write (key, results) pairs atomically; existing mappings keep the old inode."""
+    strings = bytearray()
+    string_refs: Dict[str, Tuple[int, int]] = {}
+
+    def ref(s: str) -> Tuple[int, int]:
+        s = str(s or "")[:200]
+        if s not in string_refs:
+            b = s.encode("utf-8")
+            string_refs[s] = (len(strings), len(b))
+            strings.extend(b)
+        return string_refs[s]
+
+    index = []
+    records = bytearray()
+    n_records = 0
+    for key, results in entries:
+        if not results:
+            continue
+        index.append((key_hash(*key), n_records, len(results)))
+        for r in results:
+            name_off, name_len = ref(r.get("name", "Unknown"))
+            type_off, type_len = ref(r.get("train_type", ""))
+            records.extend(_RECORD.pack(
+                name_off, name_len, type_off, type_len,
+                _minutes(r.get("departure_time")), _minutes(r.get("arrival_time")),
+                _duration_minutes(r.get("duration")),
+                _fare(r.get("economy_fare")), _fare(r.get("business_fare")), _fare(r.get("ac_fare")),
+                _first_int(r.get("stops")), _first_int(r.get("available_seats")),
+            ))
+            n_records += 1
+    index.sort()
+
+    strings_off = _HEADER.size
+    index_off = strings_off + len(strings)
+    index_off += (-index_off) % 8  # align
+    records_off = index_off + len(index) * _INDEX.size
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, int(time.time()), len(index), n_records,
+                             strings_off, index_off, records_off))
+        f.write(strings)
+        f.write(b"\0" * (index_off - strings_off - len(strings)))
+        for h, first, count in index:
+            f.write(_INDEX.pack(h, first, count))
+        f.write(records)
+    os.replace(tmp, path)
+    return len(index), n_records
+
+
+# ---------------- Process-wide snapshot ----------------
+# Mapped at startup; snapshot_lookup re-stats the file every SNAPSHOT_RECHECK
+# seconds and swaps in a rebuilt one. The old mapping is not closed by hand:
+# lookups in other threads may still be reading it, so it goes with its last reference.
+_snapshot: Optional[TimetableSnapshot] = None
+_snapshot_path: Optional[str] = None  # set by load_snapshot (server startup)
+_checked_at = 0.0
+_reload_lock = threading.Lock()
+
+
+def load_snapshot(path: str = Config.SNAPSHOT_PATH) -> Optional[TimetableSnapshot]:
+    """Map the snapshot (if present) and remember its path for later re-checks."""
+    global _snapshot, _snapshot_path, _checked_at
+    _snapshot_path, _checked_at = path, time.monotonic()
+    if not os.path.isfile(path):
+        return None
+    try:
+        snap = TimetableSnapshot(path)
+    except Exception as e:
+        Logger("TimetableSnapshot").warning(f"Snapshot load nahi ho saka: {e}")
+        return None
+    _snapshot = snap
+    return snap
+
+
+def _recheck_snapshot():
+    """Re-map the snapshot if the file was rebuilt (throttled; one thread checks, others go on)."""
+    global _checked_at
+    if _snapshot_path is None or time.monotonic() - _checked_at < Config.SNAPSHOT_RECHECK \
+            or not _reload_lock.acquire(blocking=False):
+        return
+    try:
+        _checked_at = time.monotonic()
+        try:
+            st = os.stat(_snapshot_path)
+        except OSError:
+            return
+        current = _snapshot
+        if current is None or current.file_id != (st.st_ino, st.st_mtime_ns, st.st_size):
+            if load_snapshot(_snapshot_path) is not None:
+                Logger("TimetableSnapshot").info(f"Naya snapshot map kiya: {_snapshot_path}")
+    finally:
+        _reload_lock.release()
+
+
+def get_snapshot() -> Optional[TimetableSnapshot]:
+    return _snapshot
+
+
+def snapshot_lookup(from_station, to_station, travel_date, time_preference=None) -> Optional[List[Dict[str, Any]]]:
+    _recheck_snapshot()
+    snap = _snapshot
+    if snap is None or snap.age_seconds > Config.SNAPSHOT_MAX_AGE:
+        return None
+    return snap.lookup(from_station, to_station, travel_date, time_preference)
+
+
+# ---------------- Bulk crawl ----------------
+def crawl(stations: List[str], days: int, concurrency: int = 2, start_date: Optional[str] = None):
+    """Scrape every (from, to, date, time slot) combination and return entries."""
+    from modules.scraper import PakRailScraper  # heavy import only for the crawl job
+
+    logger = Logger("SnapshotCrawl")
+    start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else datetime.now()
+    dates = [(start + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days)]
+    keys = [(fr, to, d, t) for fr, to in permutations(stations, 2) for d in dates for t in TIME_SLOTS]
+    logger.info(f"Snapshot crawl: {len(keys)} queries, concurrency={concurrency}")
+
+    def one(key):
+        fr, to, d, t = key
+        return key, PakRailScraper().scrape_train_info(fr, to, d, t or None)
+
+    entries = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(one, k) for k in keys]
+        for fut in as_completed(futures):
+            try:
+                entries.append(fut.result())
+            except Exception as e:
+                logger.warning(f"Crawl query fail: {e}")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline timetable/fare snapshot")
+    parser.add_argument("--output", default=Config.SNAPSHOT_PATH)
+    parser.add_argument("--stations", default=",".join(Config.SNAPSHOT_STATIONS),
+                        help="Comma separated station list")
+    parser.add_argument("--days", type=int, default=Config.SNAPSHOT_DAYS)
+    parser.add_argument("--start-date", default=None, help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--concurrency", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    stations = [s.strip().title() for s in args.stations.split(",") if s.strip()]
+    entries = crawl(stations, args.days, args.concurrency, args.start_date)
+    n_keys, n_records = write_snapshot(args.output, entries)
+    print(f"Snapshot written: {args.output} ({n_keys} keys, {n_records} trains)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# modules/static_files.py
+# Frontend serving for app_entry: precompressed variants + cache headers.
+#
+# - foo.js.br / foo.js.gz written at build time are sent as-is when the client's
+#   Accept-Encoding allows it (no per-request compression in the API workers)
+# - Vite's content-hashed files under assets/ are immutable for a year
+# - index.html (and other unhashed files) must revalidate: ETag / If-None-Match -> 304
+#
+#   python -m modules.static_files static/     # write .gz (and .br if `brotli` is installed)
+
+import gzip
+import mimetypes
+import os
+import sys
+from typing import List, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli  # optional; the Docker build uses the brotli CLI instead
+except Exception:
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+HASHED_DIRS = ("assets/",)
+COMPRESSIBLE = (".js", ".mjs", ".css", ".html", ".svg", ".json", ".txt", ".map", ".webmanifest")
+MIN_SIZE = 1024
+
+# preference order when the client accepts several
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _accepted(header: str) -> set:
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        rel = os.path.relpath(full_path, str(self.directory)).replace(os.sep, "/")
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+        headers = {"Cache-Control": IMMUTABLE if rel.startswith(HASHED_DIRS) else REVALIDATE}
+        path, encoding = full_path, None
+        if full_path.endswith(COMPRESSIBLE):
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted(request_headers.get("accept-encoding", ""))
+            for name, suffix in _ENCODINGS:
+                if name in accepted and os.path.isfile(full_path + suffix):
+                    path, encoding = full_path + suffix, name
+                    break
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            stat_result = os.stat(path)  # ETag/Length of the variant actually sent
+
+        response = FileResponse(path, status_code=status_code, stat_result=stat_result,
+                                media_type=media_type, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+# ---------------- Build step ----------------
+def precompress(directory: str, min_size: int = MIN_SIZE) -> List[Tuple[str, int, int]]:
+    """Write .gz (and .br when available) next to every compressible file; returns (path, size, gz size)."""
+    written = []
+    for root, _dirs, names in os.walk(directory):
+        for name in names:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            with open(path + ".gz", "wb") as f:
+                f.write(gz)
+            if brotli is not None:
+                with open(path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+            written.append((path, len(data), len(gz)))
+    return written
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    directory = argv[0] if argv else os.getenv("STATIC_DIR", "static")
+    for path, size, gz_size in precompress(directory):
+        print(f"{path}: {size} -> {gz_size} gz")
+    if brotli is None:
+        print("brotli module nahi mila: sirf .gz likhe gaye")
+
+
+if __name__ == "__main__":
+    main()
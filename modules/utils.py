@@ -1,51 +1,160 @@
+import atexit
 import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+from datetime import datetime, timezone
+from itertools import islice
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 import colorama
 from colorama import Fore, Style
 
-colorama.init()
+from config.settings import Config
+
+# Server deployments (LOG_MODE=json) never touch stdout wrapping
+if Config.LOG_MODE != "json":
+    colorama.init()
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, no ANSI codes."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the raw record; message formatting happens on the writer thread."""
+
+    def prepare(self, record):
+        return record
+
+_log_queue = None
+_log_listener = None
+
+def _queue_handler():
+    """Shared queue + single background writer thread for json mode."""
+    global _log_queue, _log_listener
+    if _log_listener is None:
+        _log_queue = queue.SimpleQueue()
+        stream = logging.StreamHandler()
+        stream.setFormatter(JsonFormatter())
+        _log_listener = logging.handlers.QueueListener(_log_queue, stream, respect_handler_level=False)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)  # flush pending records on exit
+    return _DeferredQueueHandler(_log_queue)
 
 class Logger:
+    """
+    Console mode: colored lines on stderr (CLI).
+    JSON mode:    plain JSON lines written by a background thread (server).
+
+    Extra args are %-formatted lazily, e.g. logger.info("Found %s trains", n),
+    and nothing is built when the level is disabled.
+    """
+
     def __init__(self, name):
+        self.json_mode = Config.LOG_MODE == "json"
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.INFO)
+        self.logger.setLevel(getattr(logging, Config.LOG_LEVEL, logging.INFO))
         
         if not self.logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-            )
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
+            if self.json_mode:
+                self.logger.addHandler(_queue_handler())
+                self.logger.propagate = False
+            else:
+                handler = logging.StreamHandler()
+                formatter = logging.Formatter(
+                    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+                )
+                handler.setFormatter(formatter)
+                self.logger.addHandler(handler)
+    
+    def _log(self, level, color, message, args):
+        if not self.logger.isEnabledFor(level):
+            return
+        if self.json_mode:
+            self.logger.log(level, message, *args)
+        else:
+            label = logging.getLevelName(level)
+            self.logger.log(level, f"{color}{label}: {message}{Style.RESET_ALL}", *args)
     
-    def info(self, message):
-        self.logger.info(f"{Fore.GREEN}INFO: {message}{Style.RESET_ALL}")
+    def info(self, message, *args):
+        self._log(logging.INFO, Fore.GREEN, message, args)
     
-    def error(self, message):
-        self.logger.error(f"{Fore.RED}ERROR: {message}{Style.RESET_ALL}")
+    def error(self, message, *args):
+        self._log(logging.ERROR, Fore.RED, message, args)
     
-    def warning(self, message):
-        self.logger.warning(f"{Fore.YELLOW}WARNING: {message}{Style.RESET_ALL}")
+    def warning(self, message, *args):
+        self._log(logging.WARNING, Fore.YELLOW, message, args)
 
 class DataManager:
     @staticmethod
     def save_train_data(data, filename="data/train_data.json"):
         os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, 'w', encoding='utf-8') as f:
+        # concurrent searches (bulk runs, API workers) each write a temp file and swap it in
+        tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, filename)
     
     @staticmethod
-    def load_train_data(filename="data/train_data.json"):
+    def iter_train_data(filename="data/train_data.json", chunk_size=64 * 1024):
+        """
+        Yields the records of a saved JSON array one by one, reading the file in
+        chunks; memory stays at about one chunk + one record however big the export.
+        """
+        decoder = json.JSONDecoder()
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            f = open(filename, 'r', encoding='utf-8')
         except FileNotFoundError:
-            return []
+            return
+        with f:
+            buf, pos, eof, started = "", 0, False, False
+            while True:
+                # skip separators between records
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) and not started:
+                    if buf[pos] != "[":
+                        raise ValueError(f"{filename}: JSON array expected")
+                    started, pos = True, pos + 1
+                    continue
+                if pos < len(buf) and buf[pos] == "]":
+                    return
+                if pos < len(buf):
+                    try:
+                        record, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                        record = None
+                    if record is not None:
+                        yield record
+                        pos = end
+                        continue
+                elif eof:
+                    return
+                # need more text: drop what is consumed; reading at least the leftover
+                # length doubles the buffer when one record spans several chunks
+                chunk = f.read(max(chunk_size, len(buf) - pos))
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+
+    @staticmethod
+    def load_train_data(filename="data/train_data.json"):
+        return list(DataManager.iter_train_data(filename))
 
 class DisplayManager:
     def __init__(self):
@@ -65,12 +174,8 @@ class DisplayManager:
         )
         self.console.print(panel)
     
-    def display_train_results(self, trains_data):
-        if not trains_data:
-            self.console.print("[red]Koi train data nahi mila![/red]")
-            return
-        
-        table = Table(title="🚂 Train Information")
+    def _train_table(self, trains, title="🚂 Train Information"):
+        table = Table(title=title)
         table.add_column("Train Name", style="cyan")
         table.add_column("Route", style="magenta")
         table.add_column("Departure", style="green")
@@ -80,7 +185,7 @@ class DisplayManager:
         table.add_column("AC", style="yellow")
         table.add_column("Stops", style="blue")
         
-        for train in trains_data:
+        for train in trains:
             table.add_row(
                 train.get('name', 'N/A'),
                 train.get('route', 'N/A'),
@@ -91,5 +196,36 @@ class DisplayManager:
                 train.get('ac_fare', 'N/A'),
                 train.get('stops', 'N/A')
             )
+        return table
+    
+    def display_train_results(self, trains_data):
+        if not trains_data:
+            self.console.print("[red]Koi train data nahi mila![/red]")
+            return
         
-        self.console.print(table)
\ No newline at end of file
+        self.console.print(self._train_table(trains_data))
+    
+    def display_train_pages(self, trains, page_size=Config.DISPLAY_PAGE_SIZE):
+        """
+        Windowed view over any iterable (e.g. DataManager.iter_train_data): the first
+        page prints as soon as its rows are read, the next one is only read when asked.
+        Returns the number of rows shown (0 = nothing printed, caller says so).
+        """
+        rows = iter(trains)
+        page = list(islice(rows, page_size))
+        shown, number = 0, 1
+        while page:
+            upcoming = next(rows, None)  # one row lookahead to know if there is a next page
+            shown += len(page)
+            self.console.print(self._train_table(page, title=f"🚂 Train Information (page {number}, rows {shown - len(page) + 1}-{shown})"))
+            if upcoming is None:
+                break
+            try:
+                answer = input("Enter = agla page, q = band: ").strip().lower()
+            except EOFError:
+                answer = "q"
+            if answer in ("q", "quit", "exit", "band"):
+                break
+            page = [upcoming] + list(islice(rows, page_size - 1))
+            number += 1
+        return shown
@@ -1,11 +1,27 @@
 # server.py
 import uuid
-from typing import Optional, Dict
-from fastapi import FastAPI
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
 
-from modules.ai_agent import TrainBookingAI  # ensure import path is correct
+from config.settings import Config
+from modules.ai_agent import ConversationEngine  # ensure import path is correct
+from modules.extraction import batch_stats
+from modules.fare_history import CLASSES, get_fare_history
+from modules.profiling import is_admin, list_profiles, load_profile, maybe_profile
+from modules.scrape_queue import get_broker
+from modules.scraper import fetch_stats
+from modules.search import (
+    RESULT_CACHE, get_scheduler, search_trains, speculative_stats, start_prefetch, stop_prefetch,
+)
+from modules.session_queue import RESET, SessionBusy, SessionQueues, message_key
+from modules.sessions import SessionRecord, create_session_store, decode_session, encode_session
+from modules.slot_model import get_slot_model
+from modules.snapshot import load_snapshot
 
 app = FastAPI(title="PakRail AI Chat API")
 
@@ -18,42 +34,141 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory session store: session_id -> TrainBookingAI instance
-SESSIONS: Dict[str, TrainBookingAI] = {}
+# Compress large payloads (multi-day search results); small replies stay uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=Config.GZIP_MIN_SIZE)
+
+# One shared conversation engine; per-session state is a compact SessionRecord
+ENGINE = ConversationEngine()
+
+# Session store: session_id -> serialized SessionRecord (memory / sqlite / redis via SESSION_BACKEND)
+SESSION_STORE = create_session_store()
+
+def _load_session(session_id: str) -> SessionRecord:
+    blob = SESSION_STORE.load(session_id)
+    record = decode_session(blob) if blob else None
+    return record if record is not None else ENGINE.new_session()
+
+def _save_session(session_id: str, record: SessionRecord):
+    SESSION_STORE.save(session_id, encode_session(record))
+
+# Turns of one session run in arrival order (duplicates collapsed); sessions run in parallel
+SESSION_QUEUES = SessionQueues(max_depth=Config.SESSION_QUEUE_MAX_DEPTH, max_wait=Config.SESSION_QUEUE_WAIT)
+
+@app.exception_handler(SessionBusy)
+def session_busy(request, exc):
+    # too many turns of one session in flight; don't tie up more worker threads on it
+    return ORJSONResponse({"detail": "Pichla message abhi process ho raha hai, thori der baad dobara bhejein"},
+                          status_code=429, headers={"Retry-After": "2"})
 
 class ChatRequest(BaseModel):
     message: str
     sessionId: Optional[str] = None
 
-class ChatResponse(BaseModel):
-    reply: str
-    sessionId: str
+class SearchRequest(BaseModel):
+    from_station: str
+    to_station: str
+    travel_date: str = Field(..., description="YYYY-MM-DD")
+    preferred_time: Optional[str] = None
+    days: int = Field(1, ge=1, le=Config.SEARCH_MAX_DAYS)
 
 class ResetRequest(BaseModel):
     sessionId: Optional[str] = None
 
+@app.on_event("startup")
+def _startup():
+    # map offline timetable snapshot (shared pages across workers)
+    load_snapshot()
+    # keep hot routes warm in the background
+    start_prefetch()
+    # load (or train once) the local slot model before the first chat turn
+    if Config.SLOT_MODEL_ENABLED:
+        get_slot_model()
+
+@app.on_event("shutdown")
+def _shutdown():
+    stop_prefetch()
+
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
 
-@app.post("/api/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    session_id = req.sessionId or str(uuid.uuid4())
-    if session_id not in SESSIONS:
-        SESSIONS[session_id] = TrainBookingAI()
-    agent = SESSIONS[session_id]
+@app.get("/api/metrics")
+def metrics():
+    return ORJSONResponse({
+        "cache": RESULT_CACHE.stats(),
+        "prefetch": get_scheduler().stats(),
+        "speculative": speculative_stats(),
+        "llm_batching": batch_stats(),
+        "session_queues": SESSION_QUEUES.stats(),
+        "scraper": fetch_stats(),
+        "scrape_queue": get_broker().stats() if get_broker() else None,
+    })
+
+@app.get("/api/fares/stats")
+def fare_stats(from_station: Optional[str] = None, to_station: Optional[str] = None,
+               train: Optional[str] = None, travel_class: Optional[str] = None, days: Optional[int] = None):
+    if travel_class is not None and travel_class not in CLASSES:
+        raise HTTPException(status_code=422, detail=f"travel_class {', '.join(CLASSES)} mein se dein")
+    since = (datetime.now() - timedelta(days=days)).timestamp() if days else None
+    return ORJSONResponse(get_fare_history().stats(from_station, to_station, train, travel_class, since))
+
+@app.post("/api/chat")
+def chat(req: ChatRequest, x_profile: Optional[str] = Header(None)):
+    with maybe_profile("chat", x_profile):
+        if not req.sessionId:  # brand-new session: nothing to order against
+            return _chat_turn(str(uuid.uuid4()), req.message or "")
+        return SESSION_QUEUES.run(req.sessionId, message_key(req.message),
+                                  lambda: _chat_turn(req.sessionId, req.message or ""))
+
+def _chat_turn(session_id: str, message: str):
+    record = _load_session(session_id)
+
+    reply, results = ENGINE.process(record, message, structured=True)
+    _save_session(session_id, record)
+    return ORJSONResponse({"reply": reply, "sessionId": session_id, "results": results})
+
+@app.post("/api/search")
+def search(req: SearchRequest, x_profile: Optional[str] = Header(None)):
+    with maybe_profile("search", x_profile):
+        return _search(req)
+
+def _search(req: SearchRequest):
+    try:
+        start = datetime.strptime(req.travel_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=422, detail="travel_date YYYY-MM-DD format mein dein")
+
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(req.days)]
+    results = []
+    for d in dates:
+        results.extend(search_trains(req.from_station, req.to_station, d, req.preferred_time))
+
+    # Rows are already plain dicts; skip per-row model validation and let orjson encode
+    return ORJSONResponse({
+        "from_station": req.from_station,
+        "to_station": req.to_station,
+        "dates": dates,
+        "count": len(results),
+        "results": results,
+    })
+
+@app.get("/api/profiles")
+def profiles(x_profile: Optional[str] = Header(None)):
+    if not is_admin(x_profile):
+        raise HTTPException(status_code=404)
+    return ORJSONResponse({"profiles": list_profiles()})
 
-    reply = agent.process_user_input(req.message or "")
-    return ChatResponse(reply=reply, sessionId=session_id)
+@app.get("/api/profiles/{profile_id}")
+def profile_detail(profile_id: str, x_profile: Optional[str] = Header(None)):
+    data = load_profile(profile_id) if is_admin(x_profile) else None
+    if data is None:
+        raise HTTPException(status_code=404)
+    return ORJSONResponse(data)
 
 @app.post("/api/reset")
 def reset(req: ResetRequest):
-    if req.sessionId and req.sessionId in SESSIONS:
-        try:
-            # call agent reset for cleanup
-            SESSIONS[req.sessionId].reset_conversation()
-        except:
-            pass
-        del SESSIONS[req.sessionId]
+    if req.sessionId:
+        # behind any turn still in flight, so that turn can't save the old state back
+        SESSION_QUEUES.run(req.sessionId, RESET, lambda: SESSION_STORE.delete(req.sessionId))
     return {"ok": True}
 
@@ -0,0 +1,26 @@
+import pytest
+
+from modules import extraction
+
+
+def test_batch_error_falls_back_to_single_calls(monkeypatch):
+    def batch(llm, texts, today):
+        raise RuntimeError("provider 500")
+
+    def single(llm, text, today):
+        if text == "bad":
+            raise RuntimeError("rate limited")
+        return {"text": text}
+
+    monkeypatch.setattr(extraction, "extract_batch", batch)
+    monkeypatch.setattr(extraction, "extract_slots", single)
+    batcher = extraction.ExtractionBatcher(object(), window_ms=200)
+    items = [extraction._Pending(t, "2026-10-19") for t in ("a", "bad", "b")]
+    batcher._run(items)
+
+    assert items[0].future.result(1) == {"text": "a"}
+    assert items[2].future.result(1) == {"text": "b"}
+    with pytest.raises(RuntimeError, match="rate limited"):
+        items[1].future.result(1)
+    stats = batcher.snapshot()
+    assert stats["batches"] == 1 and stats["fallbacks"] == 1 and stats["calls"] == 4
@@ -0,0 +1,34 @@
+from config.settings import Config
+from modules.latency import LatencyTracker
+
+
+def test_timeout_widens_after_slowdown_and_recovers():
+    t = LatencyTracker()
+    for _ in range(Config.LATENCY_MIN_SAMPLES):
+        t.observe(0.5)
+    base = t.timeout(30)
+    assert base == Config.LATENCY_MIN_TIMEOUT  # adapted all the way down
+
+    # upstream now answers in 10 s: every fetch times out at the adapted value
+    upstream = 10.0
+    limits = []
+    while t.timeout(30) < upstream:
+        limits.append(t.timeout(30))
+        t.observe_timeout()
+        assert len(limits) < 10, "timeout never widened"
+    assert limits[0] == base and limits == sorted(limits)
+    assert t.timeout(30) <= 30
+
+    # first success resets the streak; the slow sample keeps the timeout above it
+    t.observe(upstream)
+    assert t.timeout(30) > upstream
+    assert t.stats()["timeout_streak"] == 0
+
+
+def test_timeout_backoff_capped_at_default():
+    t = LatencyTracker()
+    for _ in range(Config.LATENCY_MIN_SAMPLES):
+        t.observe(0.5)
+    for _ in range(50):
+        t.observe_timeout()
+    assert t.timeout(30) == 30
@@ -0,0 +1,140 @@
+import time
+
+import pytest
+
+from modules.scrape_queue import JobFailed, MemoryBroker, SQLiteBroker, _expire_hung, _reap
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_broker(request, tmp_path):
+    def make(lease=60.0, attempts=2, **kwargs):
+        if request.param == "memory":
+            return MemoryBroker(lease=lease, attempts=attempts)
+        return SQLiteBroker(str(tmp_path / "queue.db"), lease=lease, attempts=attempts, **kwargs)
+    return make
+
+
+KEY = {"key": ["Lahore", "Karachi", "2026-10-20", None]}
+
+
+def test_submit_claim_complete(make_broker):
+    broker = make_broker()
+    job_id = broker.submit("search", KEY)
+    job = broker.claim("w1", timeout=0.1)
+    assert (job.id, job.kind, job.payload, job.attempts) == (job_id, "search", KEY, 1)
+    broker.complete(job_id, [{"name": "Green Line"}], "w1")
+    assert broker.result(job_id, timeout=1) == [{"name": "Green Line"}]
+    assert broker.claim("w1", timeout=0.05) is None
+
+
+def test_identical_jobs_share_one_row(make_broker):
+    broker = make_broker()
+    first = broker.submit("search", KEY)
+    assert broker.submit("search", dict(KEY)) == first
+    assert broker.submit("details", KEY) != first
+    broker.claim("w1", timeout=0.1)
+    assert broker.submit("search", KEY) == first  # still running
+    broker.complete(first, [], "w1")
+    assert broker.submit("search", KEY) != first  # finished: a new search scrapes again
+
+
+def test_lease_expiry_retries_then_fails(make_broker):
+    broker = make_broker(lease=0.05, attempts=2)
+    job_id = broker.submit("search", KEY)
+    assert broker.claim("w1", timeout=0.1).attempts == 1
+    time.sleep(0.1)
+    retried = broker.claim("w2", timeout=0.1)
+    assert (retried.id, retried.attempts) == (job_id, 2)
+    time.sleep(0.1)
+    assert broker.claim("w3", timeout=0.05) is None  # second lease expired: out of attempts
+    with pytest.raises(JobFailed, match="lease expired"):
+        broker.result(job_id, timeout=1)
+    broker.complete(job_id, "too late", "w1")  # the hung worker finishing later changes nothing
+    with pytest.raises(JobFailed):
+        broker.result(job_id, timeout=1)
+
+
+def test_fail_requeues_until_attempts_run_out(make_broker):
+    broker = make_broker(attempts=2)
+    job_id = broker.submit("search", KEY)
+    broker.claim("w1", timeout=0.1)
+    broker.fail(job_id, "boom", worker="w1")
+    job = broker.claim("w1", timeout=0.1)
+    assert (job.id, job.attempts) == (job_id, 2)
+    broker.fail(job_id, "boom again", worker="w1")
+    with pytest.raises(JobFailed, match="boom again"):
+        broker.result(job_id, timeout=1)
+
+
+def test_late_worker_cannot_touch_reclaimed_job(make_broker):
+    broker = make_broker(lease=0.05)
+    job_id = broker.submit("search", KEY)
+    broker.claim("hung", timeout=0.1)
+    time.sleep(0.1)
+    assert broker.claim("fresh", timeout=0.1).id == job_id
+    broker.complete(job_id, "stale", "hung")
+    broker.fail(job_id, "stale error", worker="hung")
+    assert [j["worker"] for j in broker.running()] == ["fresh"]
+    broker.complete(job_id, "fresh result", "fresh")
+    assert broker.result(job_id, timeout=1) == "fresh result"
+
+
+def test_fail_without_retry(make_broker):
+    broker = make_broker(attempts=3)
+    job_id = broker.submit("bogus", {})
+    broker.claim("w1", timeout=0.1)
+    broker.fail(job_id, "unknown job kind", retry=False)
+    with pytest.raises(JobFailed):
+        broker.result(job_id, timeout=1)
+
+
+def test_result_times_out(make_broker):
+    broker = make_broker()
+    job_id = broker.submit("search", KEY)
+    with pytest.raises(TimeoutError):
+        broker.result(job_id, timeout=0.05)
+
+
+class FakeProcess:
+    def __init__(self, pid, alive=True, exitcode=None):
+        self.pid = pid
+        self.alive = alive
+        self.exitcode = exitcode
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self):
+        pass
+
+    def kill(self):
+        self.alive = False
+
+
+def test_reap_requeues_job_of_dead_worker_at_once(make_broker):
+    broker = make_broker(lease=60.0)
+    dead, alive = FakeProcess(101, alive=False, exitcode=-9), FakeProcess(102)
+    lost = broker.submit("search", KEY)
+    kept = broker.submit("details", KEY)
+    broker.claim("host:101:1", timeout=0.1)
+    broker.claim("host:102:1", timeout=0.1)
+    workers = [dead, alive]
+    _reap(workers, broker, "host")
+    assert workers == [alive]
+    assert [j["id"] for j in broker.running()] == [kept]
+    job = broker.claim("host:103:1", timeout=0.1)  # long before the 60 s lease
+    assert (job.id, job.attempts) == (lost, 2)
+
+
+def test_supervisor_kills_hung_owner_before_requeue(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "queue.db"), lease=0.05, expire_on_claim=False)
+    hung, idle = FakeProcess(201), FakeProcess(202)
+    job_id = broker.submit("search", KEY)
+    broker.claim("host:201:1", timeout=0.1)
+    time.sleep(0.1)
+    # supervised workers polling don't take the expired job away from its owner
+    assert broker.claim("host:202:1", timeout=0.05) is None
+    _expire_hung([hung, idle], broker, "host")
+    assert not hung.alive and idle.alive
+    job = broker.claim("host:202:1", timeout=0.1)
+    assert (job.id, job.attempts) == (job_id, 2)
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from modules.session_queue import SessionBusy, SessionQueues
+
+
+def _start(queues, key, fn, out):
+    def target():
+        try:
+            out[key] = queues.run("s1", key, fn)
+        except SessionBusy as e:
+            out[key] = e
+    t = threading.Thread(target=target)
+    t.start()
+    return t
+
+
+def test_duplicate_collapses_only_against_tail():
+    queues = SessionQueues()
+    release = threading.Event()
+    calls, out = [], {}
+
+    def turn(name):
+        def fn():
+            if name == "a":
+                release.wait(2)
+            calls.append(name)
+            return f"{name}-{len(calls)}"
+        return fn
+
+    first = _start(queues, "a", turn("a"), out)
+    time.sleep(0.05)
+    second = _start(queues, "b", turn("b"), out)
+    time.sleep(0.05)
+    # "a" again behind "b": must run again, not reuse the first reply
+    third = threading.Thread(target=lambda: out.setdefault("a2", queues.run("s1", "a", turn("a"))))
+    third.start()
+    time.sleep(0.05)
+    release.set()
+    for t in (first, second, third):
+        t.join(2)
+    assert calls == ["a", "b", "a"]
+    assert out["a2"] == "a-3"
+
+
+def test_retry_of_tail_gets_same_reply():
+    queues = SessionQueues()
+    release = threading.Event()
+    calls, out = [], {}
+
+    def fn():
+        release.wait(2)
+        calls.append(1)
+        return "reply"
+
+    first = _start(queues, "a", fn, out)
+    time.sleep(0.05)
+    retry = threading.Thread(target=lambda: out.setdefault("retry", queues.run("s1", "a", fn)))
+    retry.start()
+    time.sleep(0.05)
+    release.set()
+    first.join(2)
+    retry.join(2)
+    assert calls == [1]
+    assert out == {"a": "reply", "retry": "reply"}
+    assert queues.stats()["collapsed"] == 1
+
+
+def test_depth_cap_and_wait_timeout():
+    queues = SessionQueues(max_depth=2, max_wait=0.2)
+    release = threading.Event()
+    out = {}
+
+    first = _start(queues, "a", lambda: release.wait(2), out)
+    time.sleep(0.05)
+    waiter = _start(queues, "b", lambda: "b", out)
+    time.sleep(0.05)
+    with pytest.raises(SessionBusy):
+        queues.run("s1", "c", lambda: "c")  # third caller on a session capped at 2
+    waiter.join(2)
+    assert isinstance(out["b"], SessionBusy)  # waited past max_wait behind "a"
+    release.set()
+    first.join(2)
+    assert queues.run("s1", "d", lambda: "d") == "d"
+    stats = queues.stats()
+    assert stats["rejected"] == 1 and stats["timed_out"] == 1 and stats["active_sessions"] == 0
@@ -0,0 +1,90 @@
+import time
+
+from modules.sessions import (
+    MemorySessionStore, RedisSessionStore, SessionRecord, SQLiteSessionStore, decode_session, encode_session,
+)
+
+
+class FakeRedis:
+    """Local stand-in for redis-py: get / set(ex=) / delete with expiry on a fake clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None or entry[0] <= self.now:
+            return None
+        return entry[1]
+
+    def set(self, key, value, ex=None):
+        self.ttls[key] = ex
+        self.data[key] = (self.now + ex if ex else float("inf"), value)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_redis_store_save_load_delete():
+    client = FakeRedis()
+    store = RedisSessionStore(client=client, ttl=60)
+    store.save("s1", b"blob")
+    assert store.load("s1") == b"blob"
+    assert store.load("missing") is None
+    store.delete("s1")
+    assert store.load("s1") is None
+
+
+def test_redis_store_sets_ttl_and_prefix():
+    client = FakeRedis()
+    store = RedisSessionStore(client=client, ttl=60, prefix="p:")
+    store.save("s1", b"blob")
+    assert client.ttls == {"p:s1": 60}
+    client.now += 61
+    assert store.load("s1") is None
+
+
+def test_memory_store_expiry_and_purge():
+    store = MemorySessionStore(ttl=60)
+    store.PURGE_EVERY = 2
+    store.save("old", b"a")
+    store._data["old"] = (time.time() - 1, b"a")  # already expired
+    assert store.load("old") is None
+    store.save("new", b"b")  # second save triggers the purge
+    assert "old" not in store._data
+    assert store.load("new") == b"b"
+
+
+def test_sqlite_store_save_load_delete(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path, ttl=60)
+    store.save("s1", b"blob")
+    store.save("s1", b"newer")  # upsert
+    assert store.load("s1") == b"newer"
+    assert store.load("missing") is None
+    assert SQLiteSessionStore(path, ttl=60).load("s1") == b"newer"  # another worker, same file
+    store.delete("s1")
+    assert store.load("s1") is None
+
+
+def test_sqlite_store_expiry_and_purge(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=-1)  # every save is already expired
+    store.PURGE_EVERY = 2
+    store.save("old", b"a")
+    assert store.load("old") is None
+    store.save("older", b"b")  # second save triggers the purge
+    rows = store._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    assert rows == 0
+
+
+def test_sqlite_store_round_trips_session_record(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=60)
+    record = SessionRecord()
+    record["stage"] = "confirm"
+    record["from_station"] = "Karachi"
+    record["to_station"] = "Lahore"
+    store.save("s1", encode_session(record))
+    loaded = decode_session(store.load("s1"))
+    assert (loaded["stage"], loaded["from_station"], loaded["to_station"]) == ("confirm", "Karachi", "Lahore")
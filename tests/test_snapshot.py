@@ -0,0 +1,40 @@
+import os
+
+from modules import snapshot
+
+KEY = ("Lahore", "Karachi", "2026-10-20", "subah")
+
+
+def _row(name):
+    return {"name": name, "departure_time": "06:00", "arrival_time": "11:30", "economy_fare": "Rs. 1,100"}
+
+
+def test_lookup_round_trip(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.snap")
+    snapshot.write_snapshot(path, [(KEY, [_row("Green Line")])])
+    monkeypatch.setattr(snapshot, "_snapshot", None)
+    monkeypatch.setattr(snapshot, "_snapshot_path", None)
+    snap = snapshot.load_snapshot(path)
+    assert [r["name"] for r in snapshot.snapshot_lookup(*KEY)] == ["Green Line"]
+    assert snap.lookup("Lahore", "Quetta", KEY[2], KEY[3]) is None
+
+
+def test_rebuilt_snapshot_is_remapped(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.snap")
+    snapshot.write_snapshot(path, [(KEY, [_row("Green Line")])])
+    monkeypatch.setattr(snapshot, "_snapshot", None)
+    monkeypatch.setattr(snapshot, "_snapshot_path", None)
+    monkeypatch.setattr(snapshot.Config, "SNAPSHOT_RECHECK", 3600)
+    old = snapshot.load_snapshot(path)
+
+    snapshot.write_snapshot(path, [(KEY, [_row("Karakoram Express")])])
+    # within the recheck interval the old mapping keeps serving
+    assert [r["name"] for r in snapshot.snapshot_lookup(*KEY)] == ["Green Line"]
+
+    monkeypatch.setattr(snapshot, "_checked_at", 0.0)
+    monkeypatch.setattr(snapshot.Config, "SNAPSHOT_RECHECK", 0)
+    assert [r["name"] for r in snapshot.snapshot_lookup(*KEY)] == ["Karakoram Express"]
+    assert snapshot.get_snapshot() is not old
+    assert old.lookup(*KEY)[0]["name"] == "Green Line"  # still readable by in-flight lookups
+    os.remove(path)
+    assert snapshot.snapshot_lookup(*KEY)[0]["name"] == "Karakoram Express"  # file gone: keep the mapping
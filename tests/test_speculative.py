@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from modules import search
+from modules.ai_agent import TrainBookingAI
+
+ROW = {"name": "Green Line", "departure_time": "06:00", "arrival_time": "11:30"}
+TURNS = ["lahore se karachi", "kal", "5000", "subah"]
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def lookup(key):
+        calls.append(key)
+        release.wait(2)
+        return [dict(ROW)]
+
+    monkeypatch.setattr(search, "_lookup", lookup)
+    monkeypatch.setattr(search, "_speculative", {})
+    monkeypatch.setattr(search, "SPEC_STATS", dict.fromkeys(search.SPEC_STATS, 0))
+    yield calls, release
+    release.set()
+
+
+def _agent():
+    agent = TrainBookingAI()
+    agent.state.degrade_mode = True  # no LLM calls in tests
+    for text in TURNS:
+        agent.process_user_input(text)
+    assert agent.state["stage"] == "confirm"
+    return agent
+
+
+def test_confirm_keeps_other_sessions_shared_search(lookups):
+    calls, release = lookups
+    a, b = _agent(), _agent()
+    key = a.state.spec_key
+    assert key == b.state.spec_key and search._speculative[key].holders == 2
+
+    release.set()
+    a.process_user_input("haan")
+    entry = search._speculative[key]  # B still holds it, not cancelled
+    assert entry.holders == 1 and not entry.future.cancelled()
+
+    b.process_user_input("haan")
+    assert len(calls) == 1  # both confirms served by one lookup
+    assert key not in search._speculative
+    assert search.SPEC_STATS["discarded"] == 0 and search.SPEC_STATS["claimed"] == 2
+
+
+def test_decline_releases_only_own_holder(lookups):
+    a, b = _agent(), _agent()
+    key = a.state.spec_key
+    a.process_user_input("nahi")
+    assert search._speculative[key].holders == 1
+    assert not search._speculative[key].future.cancelled()
+    b.process_user_input("nahi")
+    assert key not in search._speculative